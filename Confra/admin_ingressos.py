@@ -0,0 +1,124 @@
+import hmac
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+from supabase import create_client
+
+import caixa_saida
+from ingressos_qr import (
+    EVENTOS, PAGAMENTO_CANCELADO, PAGAMENTO_PENDENTE,
+    buscar_pedidos, cancelar_pedidos, confirmar_pedidos, reemitir_evento
+)
+
+# ==== Configuração da Página (DEVE SER O PRIMEIRO COMANDO STREAMLIT) ====
+st.set_page_config(
+    layout="centered",
+    page_title="Ingressos (Organização) - Chapiuski",
+    page_icon="🔐"
+)
+
+load_dotenv()
+
+# =========================================================================
+# === ACESSO ==============================================================
+# =========================================================================
+# Página só da organização: confirmar pagamentos (o que envia ingressos
+# válidos), cancelar pedidos e baixar todos os QR Codes de um evento. Nada
+# disso aparece antes da senha INGRESSOS_ADMIN_SENHA; sem ela configurada, a
+# página fica fechada. A validação na porta (validar_ingresso.py) é outra página.
+SENHA_ENV = "INGRESSOS_ADMIN_SENHA"
+
+st.title("🔐 Ingressos — Organização")
+
+senha_admin = os.getenv(SENHA_ENV)
+if not senha_admin:
+    st.error(f"❌ Variável de ambiente {SENHA_ENV} não configurada: página bloqueada.")
+    st.stop()
+
+if not st.session_state.get('admin_autorizado'):
+    with st.form("form_acesso"):
+        senha = st.text_input("Senha da organização", type="password")
+        entrar = st.form_submit_button("Entrar")
+    if entrar and hmac.compare_digest(senha.encode('utf-8'), senha_admin.encode('utf-8')):
+        st.session_state.admin_autorizado = True
+        st.rerun()
+    if entrar:
+        st.error("❌ Senha incorreta.")
+    st.stop()
+
+caixa_saida.iniciar_entregador()  # e-mails com os QR Codes saem em segundo plano
+
+
+def conectar_supabase():
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+
+# =========================================================================
+# === CONFIRMAÇÃO DE PAGAMENTOS ===========================================
+# =========================================================================
+# Os QR Codes só são enviados ao comprador quando a organização confirma o
+# pagamento aqui, depois de conferir o comprovante. Na porta, a mudança vale
+# depois de "Atualizar situação dos pagamentos" em validar_ingresso.py.
+
+with st.expander("💳 Confirmar ou cancelar pedidos", expanded=True):
+    evento_pagamento = st.selectbox("Evento", list(EVENTOS), format_func=lambda c: EVENTOS[c]['nome'], key="evento_pagamento")
+    config = EVENTOS[evento_pagamento]
+
+    if st.button("Buscar pedidos", key="buscar_pedidos"):
+        try:
+            st.session_state.pedidos_pagamento = (evento_pagamento, buscar_pedidos(conectar_supabase(), evento_pagamento))
+        except Exception as e:
+            st.error(f"❌ Erro ao buscar os pedidos: {e}")
+
+    if st.session_state.get('pedidos_pagamento') and st.session_state.pedidos_pagamento[0] == evento_pagamento:
+        pedidos = st.session_state.pedidos_pagamento[1]
+        st.dataframe(
+            pedidos[['id', config['email'], config['qtd'], config['nomes'], 'pagamento']],
+            hide_index=True, use_container_width=True
+        )
+        pendentes = pedidos.loc[pedidos['pagamento'] == PAGAMENTO_PENDENTE, 'id'].tolist()
+        ativos = pedidos.loc[pedidos['pagamento'] != PAGAMENTO_CANCELADO, 'id'].tolist()
+
+        confirmar = st.multiselect("Pedidos com pagamento conferido", pendentes, key="ids_confirmar")
+        if st.button("✅ Confirmar e enviar QR Codes", disabled=not confirmar, key="confirmar"):
+            try:
+                total = confirmar_pedidos(conectar_supabase(), evento_pagamento, confirmar, os.getenv("EMAIL_REMETENTE"))
+                st.session_state.pop('pedidos_pagamento')
+                st.success(f"✅ {total} pedido(s) confirmado(s); os QR Codes estão na caixa de saída.")
+            except Exception as e:
+                st.error(f"❌ Erro na confirmação: {e}")
+
+        cancelar = st.multiselect("Pedidos a cancelar", ativos, key="ids_cancelar")
+        if st.button("🚫 Cancelar pedidos", disabled=not cancelar, key="cancelar"):
+            try:
+                total = cancelar_pedidos(conectar_supabase(), evento_pagamento, cancelar)
+                st.session_state.pop('pedidos_pagamento')
+                st.success(f"🚫 {total} pedido(s) cancelado(s). Os QR Codes deles serão recusados na porta.")
+            except Exception as e:
+                st.error(f"❌ Erro no cancelamento: {e}")
+
+# =========================================================================
+# === REEMISSÃO EM LOTE ===================================================
+# =========================================================================
+
+with st.expander("🔁 Reemitir QR Codes de um evento"):
+    codigo_evento = st.selectbox("Evento", list(EVENTOS), format_func=lambda c: EVENTOS[c]['nome'])
+    st.caption("Só os pedidos com pagamento confirmado.")
+
+    if st.button("Gerar QR Codes", key="reemitir"):
+        cliente = conectar_supabase()
+        with st.spinner("Gerando os QR Codes dos pedidos confirmados..."):
+            try:
+                st.session_state.reemissao = (codigo_evento, *reemitir_evento(cliente, codigo_evento))
+            except Exception as e:
+                st.error(f"❌ Erro na reemissão: {e}")
+
+    if st.session_state.get('reemissao'):
+        evento_zip, arquivo_zip, total = st.session_state.reemissao
+        st.download_button(
+            f"⬇️ Baixar {total} QR Code(s) — {EVENTOS[evento_zip]['nome']}",
+            data=arquivo_zip,
+            file_name=f"qrcodes_{EVENTOS[evento_zip]['nome'].split()[0].lower()}.zip",
+            mime="application/zip",
+        )
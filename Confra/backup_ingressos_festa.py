@@ -1,16 +1,13 @@
 import os
 from datetime import datetime
 import streamlit as st
-import pandas as pd
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 from supabase import create_client, Client
 import re
 from dotenv import load_dotenv
-import io  # Importado para processar o CSV diretamente na memória RAM
+
+import caixa_saida
+import exportacao_pedidos
+from edicoes import EDICAO_FESTA
 
 # === Carregar Variáveis de Ambiente ===
 load_dotenv()
@@ -19,6 +16,9 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 EMAIL_REMETENTE = os.getenv("EMAIL_REMETENTE")
 
+# E-mails saem pela caixa de saída (caixa_saida.py), entregue em segundo plano
+caixa_saida.iniciar_entregador()
+
 st.set_page_config(page_title="Ingressos - Festa Chapiuski", layout="wide")
 
 # === Inicializar Supabase ===
@@ -29,35 +29,6 @@ def email_valido(email):
     return re.match(r"[^@]+@[^@]+\.[^@]+", email)
 
 
-def enviar_email(remetente, senha, destinatarios, assunto, corpo, comprovante, csv_bytes):
-    msg = MIMEMultipart()
-    msg['Subject'] = assunto
-    msg['From'] = remetente
-    msg['To'] = ", ".join(destinatarios)
-    msg.attach(MIMEText(corpo, 'plain'))
-
-    # Anexo do Comprovante (Upload do usuário)
-    if comprovante is not None:
-        part = MIMEBase('application', "octet-stream")
-        file_data = comprovante.getvalue()
-        part.set_payload(file_data)
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition', f'attachment; filename="{comprovante.name}"')
-        msg.attach(part)
-
-    # Anexo do CSV Filtrado (Gerado dinamicamente na memória)
-    if csv_bytes is not None:
-        part_csv = MIMEBase('application', "octet-stream")
-        part_csv.set_payload(csv_bytes)
-        encoders.encode_base64(part_csv)
-        part_csv.add_header('Content-Disposition', 'attachment; filename="compras_ingressos.csv"')
-        msg.attach(part_csv)
-
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(remetente, senha)
-        server.sendmail(remetente, destinatarios, msg.as_string())
-
-
 # =========================================================================
 # === CONTROLE MANUAL DE LOTES E LINKS (VIRE AQUI QUANDO PRECISAR) ========
 # =========================================================================
@@ -194,7 +165,8 @@ if enviado:
                 "nomes": ', '.join(nomes),
                 "documentos": ', '.join(documentos),
                 "datahora": datahora,
-                "lote": lote_atual
+                "lote": lote_atual,
+                "edicao": EDICAO_FESTA
             }
             
             # 1. Salva o novo registro no banco Supabase (exatamente como era antes)
@@ -218,29 +190,13 @@ if enviado:
 
             lista_destinatarios = [d.strip() for d in destinatario.split(",")]
 
-            # 3. GERAÇÃO DO CSV FILTRADO DIRETAMENTE DA MEMÓRIA
-            csv_bytes = None
-            try:
-                # Busca todos os dados ordenando por 'datahora'
-                response_db = supabase.table("compra_ingressos").select("*").order("datahora", desc=False).execute()
-                if response_db.data:
-                    df_completo = pd.DataFrame(response_db.data)
-                    
-                    # .iloc[282:] corta da linha 283 em diante (Python começa no índice 0)
-                    df_filtrado = df_completo[df_completo['id'] >= 283]
-                    
-                    # Filtra APENAS as colunas solicitadas originais (sem forma_pagamento)
-                    colunas_desejadas = ["id", "datahora", "email", "quantidade", "nomes", "documentos", "lote"]
-                    
-                    # O .filter() ignora colunas que porventura não existam para evitar que o código quebre
-                    df_filtrado = df_filtrado[[col for col in colunas_desejadas if col in df_filtrado.columns]]
-
-                    # Converte em bytes sem criar nenhum arquivo local no Streamlit
-                    buffer_csv = io.BytesIO()
-                    df_filtrado.to_csv(buffer_csv, index=False, encoding="utf-8")
-                    csv_bytes = buffer_csv.getvalue()
-            except Exception as e:
-                st.error(f"Erro ao processar dados para o anexo CSV: {e}")
+            # 3. Acrescenta só este pedido à planilha da organização (exportacao_pedidos.py);
+            #    a planilha completa fica no painel e os pedidos novos vão no resumo periódico
+            if resposta.data:
+                try:
+                    exportacao_pedidos.registrar_pedido("compras_ingressos", resposta.data[0])
+                except OSError as e:
+                    st.warning(f"⚠️ Não foi possível atualizar a planilha local: {e}")
 
             # 4. Corpo do e-mail textualmente (mantive a informação da forma de pagamento apenas aqui)
             corpo = f"""
@@ -254,22 +210,25 @@ Data/Hora do pedido: {datahora}
 Participantes:
 """ + "\n".join([f"{i+1}. Nome: {nomes[i]}, Documento: {documentos[i]}" for i in range(quantidade)])
 
-            # 5. Envia o e-mail para a ORGANIZAÇÃO (com CSV e comprovante)
+            # 5. Envia o e-mail para a ORGANIZAÇÃO (com o comprovante)
             try:
-                enviar_email(
+                anexos_admin = []
+                if comprovante is not None:
+                    anexos_admin.append((comprovante.name, comprovante.getvalue()))
+                caixa_saida.enviar_email(
                     remetente,
-                    senha,
                     lista_destinatarios, # Vai para a organização
                     f"Novo pedido de ingresso - {lote_atual}",
-                    corpo,
-                    comprovante,
-                    csv_bytes
+                    texto=corpo,
+                    anexos=anexos_admin
                 )
-                st.success("Dados enviados por e-mail para a organização!")
+                st.success("Dados encaminhados por e-mail para a organização!")
                 
                 # =========================================================
                 # 6. Dispara e-mail de confirmação EXCLUSIVO para o COMPRADOR
                 # =========================================================
+                # Os QR Codes dos ingressos só vão depois que a organização confirmar
+                # o pagamento (admin_ingressos.py -> ingressos_qr.confirmar_pedidos)
                 corpo_comprador = f"""Olá!
 
 Recebemos o seu pedido de reserva de ingresso(s) para a Festa Chapiuski 2026.
@@ -280,23 +239,21 @@ Recebemos o seu pedido de reserva de ingresso(s) para a Festa Chapiuski 2026.
 - Forma de pagamento escolhida: {forma_pagamento}
 
 Seu comprovante foi recebido!
+Os QR Codes dos ingressos (um por participante) serão enviados por e-mail assim que o pagamento for confirmado.
 Obrigado por fazer parte da nossa história!
 
 Obrigado,
 Organização Festa Chapiuski
 """
-                # Dispara usando a mesma função, mas apenas para o [email] digitado 
-                # e passando "None" para o CSV (para não vazar dados).
-                enviar_email(
+                # Apenas para o [email] digitado e sem anexos:
+                # nem comprovante nem CSV (para não vazar dados).
+                caixa_saida.enviar_email(
                     remetente,
-                    senha,
                     [email.strip()], # O e-mail do comprador como uma lista
                     "Confirmação de Pedido - Festa Chapiuski",
-                    corpo_comprador,
-                    None, # Deixamos None para não reenviar o comprovante (opcional)
-                    None  # NENHUM CSV AQUI! Segurança dos dados.
+                    texto=corpo_comprador
                 )
-                st.success(f"Um e-mail de confirmação foi enviado para {email}!")
+                st.success(f"Um e-mail de confirmação será enviado para {email} em instantes!")
 
             except Exception as e:
                 st.error(f"Erro ao enviar e-mails: {e}")
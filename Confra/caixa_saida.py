@@ -0,0 +1,278 @@
+import argparse
+import json
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+import correio
+
+# Caixa de saída dos e-mails dos formulários. O pedido só grava a mensagem já
+# montada (correio.montar_mensagem) numa fila SQLite local e segue em frente;
+# entregadores em segundo plano enviam a fila pelas sessões SMTP do pool do
+# correio, com novas tentativas e espera exponencial quando o servidor falha.
+#   - dentro dos apps: iniciar_entregador() sobe uma thread por sessão do pool;
+#   - fora deles: `python Confra/caixa_saida.py` roda o entregador sozinho.
+# Vários entregadores (threads ou apps) podem dividir a mesma fila: cada
+# mensagem é reservada por PRAZO_RESERVA, a reserva é renovada logo antes do
+# envio dela e a mensagem volta para a fila se quem a reservou morrer no meio.
+# Se a sessão cair (conexão, login, tempo esgotado), o lote para ali: o resto
+# volta para a fila sem gastar tentativa, em vez de reconectar mensagem a mensagem.
+ARQUIVO_FILA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "caixa_saida.sqlite")
+
+MAX_TENTATIVAS = 8
+ESPERA_INICIAL = 30       # segundos até a 2ª tentativa; dobra a cada falha
+ESPERA_MAXIMA = 60 * 60
+# Uma mensagem "enviando" há mais que isso volta para a fila. Cobre com folga o
+# pior caso do envio de uma mensagem (conexão, login e envio, mais uma reconexão,
+# cada passo limitado a correio.TEMPO_LIMITE); como a reserva é renovada a cada
+# mensagem, não depende do tamanho do lote.
+PRAZO_RESERVA = 10 * correio.TEMPO_LIMITE
+INTERVALO_VERIFICACAO = 5 # o entregador também confere a fila sozinho (mensagens de outros processos)
+LOTE = 20
+
+log = logging.getLogger("caixa_saida")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensagens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    remetente TEXT NOT NULL,
+    destinatarios TEXT NOT NULL,
+    assunto TEXT,
+    conteudo BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa TEXT NOT NULL,
+    ultimo_erro TEXT,
+    criado_em TEXT NOT NULL,
+    enviado_em TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mensagens_fila ON mensagens (status, proxima_tentativa);
+"""
+
+
+def conectar(caminho=ARQUIVO_FILA):
+    """Abre a fila (criando o esquema na primeira vez), em WAL para os apps gravarem enquanto o entregador lê."""
+    conexao = sqlite3.connect(caminho, timeout=10)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+def _agora():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+# --- ENFILEIRAMENTO (APPS) ---
+
+_novas_mensagens = threading.Event()
+
+
+def enfileirar(remetente, destinatarios, mensagem, caminho=ARQUIVO_FILA):
+    """Põe uma mensagem MIME já montada na fila e retorna o id dela, sem tocar no SMTP."""
+    if isinstance(destinatarios, str):
+        destinatarios = [destinatarios]
+    with closing(conectar(caminho)) as conexao, conexao:
+        cursor = conexao.execute(
+            """INSERT INTO mensagens (remetente, destinatarios, assunto, conteudo, proxima_tentativa, criado_em)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (remetente, json.dumps(list(destinatarios)), mensagem['Subject'], mensagem.as_bytes(), _agora(), _agora())
+        )
+    # Acorda o entregador deste processo, se houver, para enviar na hora
+    _novas_mensagens.set()
+    return cursor.lastrowid
+
+
+def enviar_email(remetente, destinatarios, assunto, texto=None, html=None, anexos=(), caminho=ARQUIVO_FILA):
+    """Monta a mensagem pelo correio (correio.montar_mensagem) e a enfileira. Retorna o id na fila."""
+    mensagem = correio.montar_mensagem(remetente, destinatarios, assunto, texto=texto, html=html, anexos=anexos)
+    return enfileirar(remetente, destinatarios, mensagem, caminho=caminho)
+
+
+def situacao(caminho=ARQUIVO_FILA):
+    """{status: quantidade} das mensagens da fila."""
+    with closing(conectar(caminho)) as conexao:
+        return dict(conexao.execute("SELECT status, COUNT(*) FROM mensagens GROUP BY status").fetchall())
+
+
+# --- RESERVA E RESULTADO (ENTREGADOR) ---
+
+def _fim_reserva():
+    return (datetime.now() + timedelta(seconds=PRAZO_RESERVA)).isoformat(timespec='seconds')
+
+
+def reservar(limite=LOTE, caminho=ARQUIVO_FILA):
+    """Reserva até `limite` mensagens vencidas (pendentes, ou 'enviando' com a reserva expirada).
+    Retorna (fim da reserva, [(id, remetente, destinatarios, conteudo, tentativas)])."""
+    agora = _agora()
+    reserva_ate = _fim_reserva()
+    with closing(conectar(caminho)) as conexao:
+        # BEGIN IMMEDIATE: dois entregadores nunca reservam a mesma mensagem
+        conexao.execute("BEGIN IMMEDIATE")
+        linhas = conexao.execute(
+            """SELECT id, remetente, destinatarios, conteudo, tentativas FROM mensagens
+               WHERE status IN ('pendente', 'enviando') AND proxima_tentativa <= ?
+               ORDER BY id LIMIT ?""",
+            (agora, limite)
+        ).fetchall()
+        conexao.executemany(
+            "UPDATE mensagens SET status = 'enviando', proxima_tentativa = ? WHERE id = ?",
+            [(reserva_ate, linha[0]) for linha in linhas]
+        )
+        conexao.commit()
+    return reserva_ate, [(id_, remetente, json.loads(destinatarios), conteudo, tentativas)
+                         for id_, remetente, destinatarios, conteudo, tentativas in linhas]
+
+
+def renovar_reserva(id_mensagem, reserva, caminho=ARQUIVO_FILA):
+    """Estende a reserva de uma mensagem logo antes de enviá-la. Retorna o novo fim
+    da reserva, ou None se ela expirou e outro entregador já a pegou."""
+    nova = _fim_reserva()
+    with closing(conectar(caminho)) as conexao, conexao:
+        cursor = conexao.execute(
+            "UPDATE mensagens SET proxima_tentativa = ? WHERE id = ? AND status = 'enviando' AND proxima_tentativa = ?",
+            (nova, id_mensagem, reserva)
+        )
+    return nova if cursor.rowcount else None
+
+
+def devolver(ids, quando, caminho=ARQUIVO_FILA):
+    """Devolve mensagens reservadas e não enviadas à fila, para `quando`, sem contar tentativa."""
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.executemany(
+            "UPDATE mensagens SET status = 'pendente', proxima_tentativa = ? WHERE id = ? AND status = 'enviando'",
+            [(quando, id_mensagem) for id_mensagem in ids]
+        )
+
+
+def marcar_enviada(id_mensagem, caminho=ARQUIVO_FILA):
+    """Marca como enviada e descarta o conteúdo (anexos inclusos); fica só o registro."""
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.execute(
+            "UPDATE mensagens SET status = 'enviado', enviado_em = ?, conteudo = X'' WHERE id = ?",
+            (_agora(), id_mensagem)
+        )
+
+
+def espera_para(tentativas):
+    """Espera antes da próxima tentativa: exponencial, com limite e um pouco de aleatoriedade."""
+    espera = min(ESPERA_INICIAL * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+    return espera * random.uniform(0.8, 1.2)
+
+
+def marcar_falha(id_mensagem, tentativas, erro, definitiva=False, caminho=ARQUIVO_FILA):
+    """Registra uma falha: reagenda com espera exponencial ou, esgotadas as tentativas, desiste."""
+    tentativas += 1
+    if definitiva or tentativas >= MAX_TENTATIVAS:
+        status, proxima = 'falhou', _agora()
+    else:
+        status = 'pendente'
+        proxima = (datetime.now() + timedelta(seconds=espera_para(tentativas))).isoformat(timespec='seconds')
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.execute(
+            "UPDATE mensagens SET status = ?, tentativas = ?, proxima_tentativa = ?, ultimo_erro = ? WHERE id = ?",
+            (status, tentativas, proxima, str(erro)[:500], id_mensagem)
+        )
+    return status, proxima
+
+
+# --- ENTREGADOR ---
+
+def entregar_pendentes(pool=None, caminho=ARQUIVO_FILA):
+    """Envia as mensagens vencidas da fila, em lotes; cada lote vai inteiro por
+    uma sessão emprestada do pool. Se a sessão falhar, para e deixa o resto para
+    a próxima rodada. Retorna quantas foram enviadas."""
+    pool = pool or correio.pool()
+    enviadas = 0
+    while True:
+        reserva, lote = reservar(caminho=caminho)
+        if not lote:
+            return enviadas
+        with pool.sessao() as sessao:
+            for posicao, (id_mensagem, remetente, destinatarios, conteudo, tentativas) in enumerate(lote):
+                reserva_mensagem = renovar_reserva(id_mensagem, reserva, caminho=caminho)
+                if reserva_mensagem is None:
+                    continue  # a reserva expirou e outro entregador já está com ela
+                try:
+                    sessao.enviar(remetente, destinatarios, conteudo)
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Endereço recusado não melhora com o tempo
+                    marcar_falha(id_mensagem, tentativas, e, definitiva=True, caminho=caminho)
+                    log.error("Mensagem %s recusada: %s", id_mensagem, e)
+                except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                    # O servidor recusou só esta mensagem; a sessão continua boa
+                    status, _ = marcar_falha(id_mensagem, tentativas, e, caminho=caminho)
+                    log.warning("Mensagem %s não aceita (%s): %s", id_mensagem, status, e)
+                except (smtplib.SMTPException, OSError) as e:
+                    # Conexão, login ou tempo esgotado: as próximas falhariam igual
+                    sessao.fechar()
+                    status, proxima = marcar_falha(id_mensagem, tentativas, e, caminho=caminho)
+                    if status == 'falhou':
+                        proxima = (datetime.now() + timedelta(seconds=ESPERA_INICIAL)).isoformat(timespec='seconds')
+                    devolver([linha[0] for linha in lote[posicao + 1:]], proxima, caminho=caminho)
+                    log.warning("Falha ao enviar a mensagem %s (%s), lote interrompido: %s", id_mensagem, status, e)
+                    return enviadas
+                else:
+                    marcar_enviada(id_mensagem, caminho=caminho)
+                    enviadas += 1
+
+
+def rodar_entregador(parar=None, caminho=ARQUIVO_FILA):
+    """Laço do entregador: esvazia a fila, espera novas mensagens (ou o intervalo) e repete."""
+    parar = parar or threading.Event()
+    pool = correio.pool()
+    while not parar.is_set():
+        _novas_mensagens.clear()
+        try:
+            entregar_pendentes(pool, caminho)
+        except Exception:
+            log.exception("Erro no entregador da caixa de saída.")
+        pool.fechar_ociosas()
+        _novas_mensagens.wait(INTERVALO_VERIFICACAO)
+    pool.fechar()
+
+
+_entregadores = []
+_entregadores_lock = threading.Lock()
+
+
+def iniciar_entregador(quantidade=correio.TAMANHO_POOL):
+    """Sobe (uma vez por processo) as threads que entregam a fila em segundo plano,
+    uma por sessão do pool: um pedido não espera o lote de outro."""
+    with _entregadores_lock:
+        _entregadores[:] = [thread for thread in _entregadores if thread.is_alive()]
+        while len(_entregadores) < quantidade:
+            thread = threading.Thread(
+                target=rodar_entregador, name=f"caixa_saida-{len(_entregadores) + 1}", daemon=True
+            )
+            thread.start()
+            _entregadores.append(thread)
+    return list(_entregadores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entregador da caixa de saída de e-mails.")
+    parser.add_argument("--uma-vez", action="store_true", help="envia o que estiver vencido e sai")
+    parser.add_argument("--situacao", action="store_true", help="mostra quantas mensagens há em cada estado")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.situacao:
+        print(situacao())
+    elif args.uma_vez:
+        log.info("%s mensagem(ns) enviada(s).", entregar_pendentes())
+        correio.pool().fechar()
+    else:
+        rodar_entregador()
+
+
+if __name__ == "__main__":
+    main()
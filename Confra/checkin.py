@@ -0,0 +1,78 @@
+import bisect
+import re
+import unicodedata
+
+# Check-in na porta: em vez de rolar a lista expandida de participantes, a busca
+# usa um índice em memória montado uma vez por versão dos dados.
+#   - nomes: lista ordenada de (sufixo de palavra normalizado, posição), para busca
+#     por prefixo com bisect em O(log n) — "sil" acha "Ana Silva" e "Silvio";
+#   - documentos: dicionário documento normalizado -> posições (busca exata).
+# As entradas registradas ficam no espelho local (checkin_offline.py).
+LIMITE_RESULTADOS = 20
+
+COLUNAS_INGRESSO = ['chave', 'nome', 'documento', 'comprador', 'crianca']
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples ("João D'Ávila" -> "joao davila")."""
+    if texto is None or texto != texto:  # None ou NaN
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(re.sub(r'[^\w\s]', '', texto).split())
+
+
+def normalizar_documento(documento):
+    """Só letras e dígitos, em minúsculas ("RG 12.345.678-9" -> "rg123456789")."""
+    return re.sub(r'[^0-9a-z]', '', normalizar_texto(documento))
+
+
+def _variantes_documento(documento):
+    """Chaves de busca exata de um documento: a forma normalizada e, se houver prefixo
+    em letras (RG, CPF...), também só os dígitos — o porteiro costuma digitar só o número."""
+    normalizado = normalizar_documento(documento)
+    digitos = re.sub(r'\D', '', normalizado)
+    return {v for v in (normalizado, digitos) if v}
+
+
+def montar_indice(ingressos):
+    """Monta o índice de check-in de um evento.
+
+    `ingressos` é um DataFrame com 1 linha por ingresso e as colunas de
+    COLUNAS_INGRESSO: `chave` (identificador estável do ingresso, ex. "id-seq"),
+    `nome`, `documento`, `comprador` e `crianca` (bool)."""
+    registros = ingressos[COLUNAS_INGRESSO].to_dict('records')
+
+    nomes = []
+    documentos = {}
+    for posicao, registro in enumerate(registros):
+        palavras = normalizar_texto(registro['nome']).split()
+        # Um sufixo por palavra: a busca por prefixo acha o nome por qualquer uma delas
+        nomes.extend((' '.join(palavras[i:]), posicao) for i in range(len(palavras)))
+        for chave_documento in _variantes_documento(registro['documento']):
+            documentos.setdefault(chave_documento, []).append(posicao)
+
+    nomes.sort()
+    return {
+        'registros': registros,
+        'chaves_nome': [sufixo for sufixo, _ in nomes],
+        'posicoes_nome': [posicao for _, posicao in nomes],
+        'documentos': documentos,
+    }
+
+
+def buscar(indice, termo, limite=LIMITE_RESULTADOS):
+    """Ingressos cujo documento é exatamente `termo` ou cujo nome tem uma palavra que
+    começa com `termo` (sem acento/caixa). Documentos vêm primeiro; sem repetição."""
+    posicoes = []
+    for chave_documento in _variantes_documento(termo):
+        posicoes.extend(indice['documentos'].get(chave_documento, []))
+
+    prefixo = normalizar_texto(termo)
+    if prefixo:
+        chaves = indice['chaves_nome']
+        i = bisect.bisect_left(chaves, prefixo)
+        while i < len(chaves) and chaves[i].startswith(prefixo) and len(posicoes) < limite * 4:
+            posicoes.append(indice['posicoes_nome'][i])
+            i += 1
+
+    return [indice['registros'][p] for p in dict.fromkeys(posicoes)][:limite]
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from checkin import COLUNAS_INGRESSO, normalizar_documento, normalizar_texto
+from leitura_supabase import buscar_tabela_paginada
+
+# Espelho local do check-in para o dia do evento (o local tem internet ruim).
+#   - ingressos: última cópia das listas expandidas de cada evento, indexada por
+#     nome e documento normalizados;
+#   - entradas: check-ins registrados neste aparelho, com as marcas `sincronizado`
+#     (estado atual já enviado) e `no_servidor` (a linha existe no Supabase);
+#   - pagamentos: última cópia da situação do pagamento de cada pedido, que a
+#     validação dos QR Codes consulta para recusar pedidos não confirmados.
+# As entradas são gravadas localmente na hora e enviadas ao Supabase em lote
+# (tabela TABELA_ENTRADAS, ver sql/checkin_entradas.sql) quando houver conexão.
+ARQUIVO_ESPELHO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkin_offline.sqlite")
+TABELA_ENTRADAS = "checkin_entradas"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ingressos (
+    evento TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    nome TEXT,
+    documento TEXT,
+    comprador TEXT,
+    crianca INTEGER NOT NULL DEFAULT 0,
+    nome_normalizado TEXT,
+    documento_normalizado TEXT,
+    PRIMARY KEY (evento, chave)
+);
+CREATE INDEX IF NOT EXISTS idx_ingressos_nome ON ingressos (evento, nome_normalizado);
+CREATE INDEX IF NOT EXISTS idx_ingressos_documento ON ingressos (evento, documento_normalizado);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    evento TEXT PRIMARY KEY,
+    salvo_em TEXT NOT NULL,
+    total INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entradas (
+    evento TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    horario TEXT NOT NULL,
+    removido INTEGER NOT NULL DEFAULT 0,
+    sincronizado INTEGER NOT NULL DEFAULT 0,
+    no_servidor INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (evento, chave)
+);
+CREATE INDEX IF NOT EXISTS idx_entradas_pendentes ON entradas (sincronizado);
+
+CREATE TABLE IF NOT EXISTS pagamentos (
+    evento TEXT NOT NULL,
+    pedido INTEGER NOT NULL,
+    situacao TEXT NOT NULL,
+    PRIMARY KEY (evento, pedido)
+);
+
+CREATE TABLE IF NOT EXISTS snapshots_pagamentos (
+    evento TEXT PRIMARY KEY,
+    salvo_em TEXT NOT NULL,
+    total INTEGER NOT NULL
+);
+"""
+
+
+def conectar(caminho=ARQUIVO_ESPELHO):
+    """Abre o espelho (criando o esquema na primeira vez). WAL permite que vários
+    aparelhos/sessões leiam enquanto um registra uma entrada."""
+    conexao = sqlite3.connect(caminho, timeout=10)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+# --- SNAPSHOT DAS LISTAS ---
+
+def salvar_snapshot(evento, ingressos, caminho=ARQUIVO_ESPELHO):
+    """Substitui a cópia local dos ingressos do evento (DataFrame em checkin.COLUNAS_INGRESSO)."""
+    linhas = [
+        (evento, str(r['chave']), r['nome'], r['documento'], r['comprador'], int(bool(r['crianca'])),
+         normalizar_texto(r['nome']), normalizar_documento(r['documento']))
+        for r in ingressos[COLUNAS_INGRESSO].to_dict('records')
+    ]
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.execute("DELETE FROM ingressos WHERE evento = ?", (evento,))
+        conexao.executemany("INSERT INTO ingressos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+        conexao.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+            (evento, datetime.now().isoformat(timespec='seconds'), len(linhas))
+        )
+
+
+def info_snapshot(evento, caminho=ARQUIVO_ESPELHO):
+    """(salvo_em, total) do último snapshot do evento, ou None."""
+    with closing(conectar(caminho)) as conexao:
+        return conexao.execute("SELECT salvo_em, total FROM snapshots WHERE evento = ?", (evento,)).fetchone()
+
+
+def carregar_ingressos(evento, caminho=ARQUIVO_ESPELHO):
+    """Ingressos do último snapshot, no formato de checkin.COLUNAS_INGRESSO."""
+    with closing(conectar(caminho)) as conexao:
+        df = pd.read_sql_query(
+            "SELECT chave, nome, documento, comprador, crianca FROM ingressos WHERE evento = ? ORDER BY rowid",
+            conexao, params=(evento,)
+        )
+    df['crianca'] = df['crianca'].astype(bool)
+    return df
+
+
+def buscar_ingresso(evento, chave, caminho=ARQUIVO_ESPELHO):
+    """Dados de um ingresso do snapshot ({coluna: valor}), ou None se não estiver lá."""
+    with closing(conectar(caminho)) as conexao:
+        linha = conexao.execute(
+            "SELECT chave, nome, documento, comprador, crianca FROM ingressos WHERE evento = ? AND chave = ?",
+            (evento, chave)
+        ).fetchone()
+    return dict(zip(COLUNAS_INGRESSO, linha)) if linha else None
+
+
+# --- SITUAÇÃO DOS PAGAMENTOS ---
+
+def salvar_pagamentos(evento, situacoes, caminho=ARQUIVO_ESPELHO):
+    """Substitui a cópia local da situação dos pedidos do evento ({id do pedido: situação})."""
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.execute("DELETE FROM pagamentos WHERE evento = ?", (evento,))
+        conexao.executemany(
+            "INSERT INTO pagamentos VALUES (?, ?, ?)",
+            [(evento, int(pedido), situacao) for pedido, situacao in situacoes.items()]
+        )
+        conexao.execute(
+            "INSERT OR REPLACE INTO snapshots_pagamentos VALUES (?, ?, ?)",
+            (evento, datetime.now().isoformat(timespec='seconds'), len(situacoes))
+        )
+
+
+def info_pagamentos(evento, caminho=ARQUIVO_ESPELHO):
+    """(salvo_em, total) da última cópia da situação dos pagamentos do evento, ou None."""
+    with closing(conectar(caminho)) as conexao:
+        return conexao.execute("SELECT salvo_em, total FROM snapshots_pagamentos WHERE evento = ?", (evento,)).fetchone()
+
+
+def situacao_pagamento(evento, pedido, caminho=ARQUIVO_ESPELHO):
+    """Situação do pagamento do pedido na última cópia, ou None se ele não estiver lá."""
+    with closing(conectar(caminho)) as conexao:
+        linha = conexao.execute(
+            "SELECT situacao FROM pagamentos WHERE evento = ? AND pedido = ?", (evento, int(pedido))
+        ).fetchone()
+    return linha[0] if linha else None
+
+
+# --- ENTRADAS ---
+
+def registrar_entrada(evento, chave, quando=None, caminho=ARQUIVO_ESPELHO):
+    """Marca a entrada do ingresso (ou reativa uma entrada desfeita). Retorna False se ele já tinha entrado."""
+    horario = (quando or datetime.now()).isoformat(timespec='seconds')
+    with closing(conectar(caminho)) as conexao, conexao:
+        cursor = conexao.execute(
+            """INSERT INTO entradas (evento, chave, horario) VALUES (?, ?, ?)
+               ON CONFLICT (evento, chave) DO UPDATE
+               SET horario = excluded.horario, removido = 0, sincronizado = 0
+               WHERE entradas.removido = 1""",
+            (evento, chave, horario)
+        )
+        return cursor.rowcount > 0
+
+
+def desfazer_entrada(evento, chave, caminho=ARQUIVO_ESPELHO):
+    """Desfaz uma entrada. Se ela nunca chegou ao Supabase, some direto; se chegou,
+    fica marcada como removida até a próxima sincronização apagar lá também."""
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.execute("DELETE FROM entradas WHERE evento = ? AND chave = ? AND no_servidor = 0", (evento, chave))
+        conexao.execute("UPDATE entradas SET removido = 1, sincronizado = 0 WHERE evento = ? AND chave = ?", (evento, chave))
+
+
+def entradas(evento, caminho=ARQUIVO_ESPELHO):
+    """{chave: horário (datetime)} das entradas ativas do evento."""
+    with closing(conectar(caminho)) as conexao:
+        linhas = conexao.execute(
+            "SELECT chave, horario FROM entradas WHERE evento = ? AND removido = 0", (evento,)
+        ).fetchall()
+    return {chave: datetime.fromisoformat(horario) for chave, horario in linhas}
+
+
+def total_pendentes(caminho=ARQUIVO_ESPELHO):
+    with closing(conectar(caminho)) as conexao:
+        return conexao.execute("SELECT COUNT(*) FROM entradas WHERE sincronizado = 0").fetchone()[0]
+
+
+# --- SINCRONIZAÇÃO COM O SUPABASE ---
+
+def sincronizar(cliente, caminho=ARQUIVO_ESPELHO):
+    """Envia as entradas pendentes em lote (um upsert para as novas e um delete por
+    evento para as desfeitas) e depois espelha o Supabase: traz as entradas dos
+    outros aparelhos e descarta as que eles desfizeram. Retorna (enviadas, removidas, recebidas)."""
+    with closing(conectar(caminho)) as conexao:
+        pendentes = conexao.execute(
+            "SELECT evento, chave, horario, removido FROM entradas WHERE sincronizado = 0"
+        ).fetchall()
+
+    novas = [{'evento': e, 'chave': c, 'horario': h} for e, c, h, removido in pendentes if not removido]
+    removidas = {}
+    for evento, chave, _, removido in pendentes:
+        if removido:
+            removidas.setdefault(evento, []).append(chave)
+
+    if novas:
+        cliente.table(TABELA_ENTRADAS).upsert(novas, on_conflict='evento,chave').execute()
+    for evento, chaves in removidas.items():
+        cliente.table(TABELA_ENTRADAS).delete().eq('evento', evento).in_('chave', chaves).execute()
+
+    remotas = buscar_tabela_paginada(cliente, TABELA_ENTRADAS, 'id, evento, chave, horario')
+
+    with closing(conectar(caminho)) as conexao, conexao:
+        # Só marca o que foi lido acima: entradas feitas durante o envio ficam para a próxima vez
+        for evento, chave, horario, removido in pendentes:
+            if removido:
+                conexao.execute("DELETE FROM entradas WHERE evento = ? AND chave = ? AND removido = 1 AND horario = ?",
+                                (evento, chave, horario))
+            else:
+                conexao.execute("UPDATE entradas SET sincronizado = 1, no_servidor = 1 WHERE evento = ? AND chave = ? AND horario = ?",
+                                (evento, chave, horario))
+
+        chaves_remotas = set()
+        recebidas = 0
+        for remota in remotas.to_dict('records'):
+            chaves_remotas.add((remota['evento'], remota['chave']))
+            recebidas += conexao.execute(
+                "INSERT OR IGNORE INTO entradas (evento, chave, horario, sincronizado, no_servidor) VALUES (?, ?, ?, 1, 1)",
+                (remota['evento'], remota['chave'], str(remota['horario'])[:19])
+            ).rowcount
+
+        # Entradas já sincronizadas que sumiram do Supabase foram desfeitas em outro aparelho
+        sincronizadas = conexao.execute("SELECT evento, chave FROM entradas WHERE sincronizado = 1").fetchall()
+        conexao.executemany(
+            "DELETE FROM entradas WHERE evento = ? AND chave = ? AND sincronizado = 1",
+            [linha for linha in sincronizadas if linha not in chaves_remotas]
+        )
+
+    return len(novas), sum(len(c) for c in removidas.values()), recebidas
@@ -0,0 +1,196 @@
+import mimetypes
+import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# Correio compartilhado pelos apps: monta as mensagens (texto/HTML + anexos) e
+# mantém um pool de sessões SMTP autenticadas, cada uma enviando várias
+# mensagens antes de ser renovada. Quem envia de fato é a caixa de saída
+# (caixa_saida.py); os apps só montam a mensagem e enfileiram.
+# O servidor vem do ambiente (SMTP_HOST, SMTP_PORTA, SMTP_SSL, SMTP_STARTTLS), com
+# login por EMAIL_REMETENTE/EMAIL_SENHA; o padrão é o Gmail. Para testar basta
+# apontar SMTP_HOST/SMTP_PORTA para um servidor local e deixar EMAIL_SENHA vazia.
+TAMANHO_POOL = int(os.getenv("SMTP_SESSOES", "2"))
+MENSAGENS_POR_SESSAO = 80  # o Gmail encerra sessões longas demais; renova antes disso
+TEMPO_OCIOSO = 60          # fecha a sessão depois de tanto tempo sem enviar
+TEMPO_LIMITE = 30          # segundos de espera por cada operação no servidor (conexão, login, envio)
+
+
+# --- MONTAGEM DAS MENSAGENS ---
+
+def anexo(nome, conteudo, tipo=None):
+    """Parte MIME de um anexo, codificada em base64."""
+    tipo = tipo or mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    principal, subtipo = tipo.split('/', 1)
+    parte = MIMEBase(principal, subtipo)
+    parte.set_payload(conteudo)
+    encoders.encode_base64(parte)
+    parte.add_header('Content-Disposition', 'attachment', filename=nome)
+    return parte
+
+
+def montar_mensagem(remetente, destinatarios, assunto, texto=None, html=None, anexos=()):
+    """Mensagem MIME com corpo em texto e/ou HTML. `anexos` são pares (nome do
+    arquivo, bytes); partes MIME prontas também são aceitas."""
+    if isinstance(destinatarios, str):
+        destinatarios = [destinatarios]
+
+    msg = MIMEMultipart()
+    msg['Subject'] = assunto
+    msg['From'] = remetente
+    msg['To'] = ", ".join(destinatarios)
+
+    if texto is not None and html is not None:
+        corpo = MIMEMultipart('alternative')
+        corpo.attach(MIMEText(texto, 'plain', 'utf-8'))
+        corpo.attach(MIMEText(html, 'html', 'utf-8'))
+        msg.attach(corpo)
+    elif html is not None:
+        msg.attach(MIMEText(html, 'html', 'utf-8'))
+    else:
+        msg.attach(MIMEText(texto or "", 'plain', 'utf-8'))
+
+    for item in anexos:
+        msg.attach(item if isinstance(item, MIMEBase) else anexo(*item))
+    return msg
+
+
+# --- SESSÕES SMTP ---
+
+def configuracao_smtp():
+    """Servidor e credenciais do ambiente (lidos na hora, depois do load_dotenv dos apps)."""
+    ssl = os.getenv("SMTP_SSL", "1").strip().lower() not in ("0", "false", "nao", "não", "")
+    return {
+        'host': os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        'porta': int(os.getenv("SMTP_PORTA", "465" if ssl else "587")),
+        'ssl': ssl,
+        'starttls': os.getenv("SMTP_STARTTLS", "0").strip().lower() in ("1", "true", "sim"),
+        'usuario': os.getenv("EMAIL_REMETENTE"),
+        'senha': os.getenv("EMAIL_SENHA"),
+    }
+
+
+class ConexaoSMTP:
+    """Uma sessão SMTP autenticada reaproveitada entre mensagens. Se o servidor
+    derrubar a conexão, reconecta e tenta a mesma mensagem mais uma vez."""
+
+    def __init__(self, config=None):
+        self.config = config or configuracao_smtp()
+        self.servidor = None
+        self.ultimo_uso = 0.0
+        self.enviadas = 0
+
+    def _abrir(self):
+        c = self.config
+        if c['ssl']:
+            servidor = smtplib.SMTP_SSL(c['host'], c['porta'], timeout=TEMPO_LIMITE)
+        else:
+            servidor = smtplib.SMTP(c['host'], c['porta'], timeout=TEMPO_LIMITE)
+            if c['starttls']:
+                servidor.starttls()
+        if c['senha']:
+            servidor.login(c['usuario'], c['senha'])
+        self.servidor = servidor
+        self.enviadas = 0
+
+    def enviar(self, remetente, destinatarios, conteudo):
+        if self.enviadas >= MENSAGENS_POR_SESSAO:
+            self.fechar()
+        for tentativa in range(2):
+            if self.servidor is None:
+                self._abrir()
+            try:
+                self.servidor.sendmail(remetente, destinatarios, conteudo)
+                self.ultimo_uso = time.monotonic()
+                self.enviadas += 1
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Fecha o socket da sessão caída antes de abrir outra (sem QUIT: o servidor já foi)
+                try:
+                    self.servidor.close()
+                except OSError:
+                    pass
+                self.servidor = None
+                if tentativa:
+                    raise
+
+    def fechar_se_ociosa(self, limite=TEMPO_OCIOSO):
+        if self.servidor is not None and time.monotonic() - self.ultimo_uso > limite:
+            self.fechar()
+
+    def fechar(self):
+        if self.servidor is not None:
+            try:
+                self.servidor.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.servidor = None
+
+
+class PoolSMTP:
+    """Até `tamanho` sessões SMTP abertas, emprestadas a quem envia. Limitar e
+    reaproveitar as sessões evita um handshake TLS + login por mensagem e mantém
+    o número de conexões novas abaixo do limite do Gmail."""
+
+    def __init__(self, tamanho=TAMANHO_POOL, config=None):
+        self.config = config
+        self._livres = queue.LifoQueue()  # a última devolvida é a que tem mais chance de ainda estar aberta
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._todas = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def sessao(self):
+        """Empresta uma sessão (esperando se todas estiverem em uso) e a devolve no fim."""
+        with self._vagas:
+            try:
+                conexao = self._livres.get_nowait()
+            except queue.Empty:
+                conexao = ConexaoSMTP(self.config)
+                with self._lock:
+                    self._todas.append(conexao)
+            try:
+                yield conexao
+            finally:
+                self._livres.put(conexao)
+
+    def enviar(self, remetente, destinatarios, conteudo):
+        with self.sessao() as conexao:
+            conexao.enviar(remetente, destinatarios, conteudo)
+
+    def fechar_ociosas(self, limite=TEMPO_OCIOSO):
+        """Fecha as sessões livres sem uso há mais de `limite` segundos (as emprestadas ficam como estão)."""
+        livres = []
+        while True:
+            try:
+                livres.append(self._livres.get_nowait())
+            except queue.Empty:
+                break
+        for conexao in reversed(livres):
+            conexao.fechar_se_ociosa(limite)
+            self._livres.put(conexao)
+
+    def fechar(self):
+        with self._lock:
+            for conexao in self._todas:
+                conexao.fechar()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    """Pool de sessões do processo (criado na primeira chamada)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolSMTP()
+        return _pool
@@ -0,0 +1,25 @@
+# Edição (evento) a que cada pedido pertence. As tabelas de pedidos guardam
+# várias edições (a compra_confra recebe a Confra 2025 e, a partir do id 54, as
+# camisetas 2026; a compra_ingressos recebe a Festa 8 Anos e, a partir do id
+# 283, a Festa 2026), então cada insert grava a coluna `edicao` e toda leitura
+# filtra por ela no próprio banco (índice (edicao, id), ver sql/edicao_pedidos.sql):
+# o custo de uma consulta depende só da edição atual, não do histórico acumulado.
+# Para abrir uma nova edição basta trocar a constante do formulário aqui.
+COLUNA_EDICAO = "edicao"
+
+EDICAO_CONFRA = "confra-2025"         # formulario_compra.py -> compra_confra
+EDICAO_CAMISETAS = "camisetas-2026"   # venda_camisetas.py -> compra_confra
+EDICAO_FESTA = "festa-2026"           # backup_ingressos_festa.py -> compra_ingressos
+EDICAO_CAMISAS = "camisas-2025"       # compra_camisas
+
+# Edição mostrada no painel de vendas para cada tabela
+EDICAO_ATUAL = {
+    'compra_confra': EDICAO_CONFRA,
+    'compra_camisas': EDICAO_CAMISAS,
+    'compra_ingressos': EDICAO_FESTA,
+}
+
+
+def filtro_edicao(edicao):
+    """Filtro no formato de leitura_supabase.buscar_tabela_paginada (aplicado no servidor)."""
+    return [('eq', COLUNA_EDICAO, edicao)]
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+from contextlib import closing
+
+# Estoque por edição e item (ex.: ingressos e copos da Confra) em contadores
+# atualizados atomicamente, no lugar de somar a quantidade de todos os pedidos a
+# cada visita. Ler o estoque custa uma linha por item; reservar é tudo-ou-nada e
+# nunca passa do limite, mesmo com vários pedidos ao mesmo tempo.
+#   - EstoqueSupabase: tabela `estoque` e funções reservar_estoque/liberar_estoque
+#     do banco (sql/estoque.sql), chamadas via rpc;
+#   - EstoqueLocal: os mesmos contadores num SQLite local, para testar ou rodar
+#     sem o banco (ESTOQUE_LOCAL=1).
+# Os limites continuam definidos nos apps (ex.: ESTOQUE_MAX_CONFRA) e vão junto
+# em cada reserva. O formulário grava o pedido por inserir_pedido, que reserva e
+# insere num passo só: um processo que morre no meio não deixa unidades presas.
+TABELA_ESTOQUE = "estoque"
+TABELA_PEDIDOS = "compra_confra"
+ARQUIVO_LOCAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "estoque.sqlite")
+
+
+class _Estoque:
+
+    def disponivel(self, edicao, limites):
+        """{item: unidades ainda disponíveis} para os itens de `limites`."""
+        vendidos = self.vendidos(edicao)
+        return {item: max(0, limite - vendidos.get(item, 0)) for item, limite in limites.items()}
+
+
+class EstoqueSupabase(_Estoque):
+    """Contadores na tabela `estoque` do Supabase."""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def vendidos(self, edicao):
+        resposta = self.cliente.table(TABELA_ESTOQUE).select('item, vendido').eq('edicao', edicao).execute()
+        return {linha['item']: int(linha['vendido']) for linha in resposta.data or []}
+
+    def reservar(self, edicao, itens, limites):
+        """Reserva {item: qtd} se tudo couber nos limites. Retorna False (sem reservar nada) se não couber."""
+        resposta = self.cliente.rpc(
+            'reservar_estoque', {'p_edicao': edicao, 'p_itens': itens, 'p_limites': limites}
+        ).execute()
+        return bool(resposta.data)
+
+    def liberar(self, edicao, itens):
+        """Devolve {item: qtd} ao estoque (pedido cancelado ou apagado)."""
+        self.cliente.rpc('liberar_estoque', {'p_edicao': edicao, 'p_itens': itens}).execute()
+
+    def inserir_pedido(self, pedido, itens, limites):
+        """Reserva {item: qtd} na edição do pedido e insere o pedido na mesma transação
+        do banco (função inserir_pedido_confra). Retorna a linha gravada, ou None se não coube."""
+        resposta = self.cliente.rpc(
+            'inserir_pedido_confra', {'p_pedido': pedido, 'p_itens': itens, 'p_limites': limites}
+        ).execute()
+        return resposta.data or None
+
+
+class EstoqueLocal(_Estoque):
+    """Os mesmos contadores num SQLite local (mesmo esquema da tabela do banco).
+    O pedido continua indo para o Supabase de `cliente`."""
+
+    def __init__(self, caminho=ARQUIVO_LOCAL, cliente=None):
+        self.caminho = caminho
+        self.cliente = cliente
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute(
+                """CREATE TABLE IF NOT EXISTS estoque (
+                       edicao TEXT NOT NULL,
+                       item TEXT NOT NULL,
+                       vendido INTEGER NOT NULL DEFAULT 0 CHECK (vendido >= 0),
+                       PRIMARY KEY (edicao, item)
+                   )"""
+            )
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    def vendidos(self, edicao):
+        with closing(self._conectar()) as conexao:
+            return dict(conexao.execute("SELECT item, vendido FROM estoque WHERE edicao = ?", (edicao,)).fetchall())
+
+    @staticmethod
+    def _reservar(conexao, edicao, itens, limites):
+        """Reserva dentro da transação já aberta em `conexao`. Retorna False se algum item não coube."""
+        for item, quantidade in sorted(itens.items()):
+            if quantidade <= 0:
+                continue
+            conexao.execute("INSERT OR IGNORE INTO estoque (edicao, item) VALUES (?, ?)", (edicao, item))
+            cursor = conexao.execute(
+                "UPDATE estoque SET vendido = vendido + ? WHERE edicao = ? AND item = ? AND vendido + ? <= ?",
+                (quantidade, edicao, item, quantidade, limites.get(item))
+            )
+            if cursor.rowcount == 0:
+                return False
+        return True
+
+    def reservar(self, edicao, itens, limites):
+        with closing(self._conectar()) as conexao:
+            # BEGIN IMMEDIATE: reservas concorrentes (de outros processos) esperam a vez
+            conexao.execute("BEGIN IMMEDIATE")
+            if not self._reservar(conexao, edicao, itens, limites):
+                conexao.execute("ROLLBACK")
+                return False
+            conexao.execute("COMMIT")
+            return True
+
+    def liberar(self, edicao, itens):
+        with closing(self._conectar()) as conexao:
+            conexao.executemany(
+                "UPDATE estoque SET vendido = MAX(vendido - ?, 0) WHERE edicao = ? AND item = ?",
+                [(quantidade, edicao, item) for item, quantidade in itens.items()]
+            )
+
+
+    def inserir_pedido(self, pedido, itens, limites):
+        """Reserva e insere o pedido no Supabase com a transação local aberta: a
+        reserva só é confirmada se o insert deu certo (se o processo morrer antes,
+        o SQLite a desfaz). Retorna a linha gravada, ou None se não coube."""
+        with closing(self._conectar()) as conexao:
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._reservar(conexao, pedido['edicao'], itens, limites):
+                    conexao.execute("ROLLBACK")
+                    return None
+                resposta = self.cliente.table(TABELA_PEDIDOS).insert(pedido).execute()
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+            conexao.execute("COMMIT")
+            return (resposta.data or [pedido])[0]
+
+
+def abrir_estoque(cliente):
+    """Estoque do Supabase, ou o local com ESTOQUE_LOCAL=1."""
+    if os.getenv("ESTOQUE_LOCAL", "").strip().lower() in ("1", "true", "sim"):
+        return EstoqueLocal(cliente=cliente)
+    return EstoqueSupabase(cliente)
@@ -0,0 +1,239 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+import caixa_saida
+import correio
+from edicoes import EDICAO_CAMISETAS, EDICAO_CONFRA, EDICAO_FESTA, filtro_edicao
+from leitura_supabase import buscar_tabela_paginada
+
+# Exportação incremental dos pedidos para a organização. Em vez de baixar a
+# tabela inteira do Supabase e anexar o histórico completo a cada pedido, cada
+# formulário acrescenta só a linha do pedido recém-inserido a um CSV local
+# (append-only). A organização recebe:
+#   - um resumo periódico por e-mail só com os pedidos novos desde o último
+#     (`python Confra/exportacao_pedidos.py`, via cron, ou com --intervalo);
+#   - a planilha completa para baixar no painel (acompanhamento_camisas.py).
+# `--reconstruir` refaz os arquivos a partir do Supabase (primeira vez, ou se
+# algum pedido ficou de fora) — é a única operação que lê a tabela inteira.
+# A pasta vem de EXPORTACOES_PASTA e precisa ser a MESMA para todos: os três
+# formulários (que escrevem), o painel (que baixa) e o cron do resumo (que lê).
+# Com os apps em máquinas separadas ou em disco efêmero (ex.: Streamlit Cloud),
+# aponte todos para um volume compartilhado; sem isso o painel só vê o que ele
+# mesmo reconstruiu e o resumo não encontra pedidos novos.
+PASTA_EXPORTACOES_ENV = "EXPORTACOES_PASTA"
+PASTA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exportacoes")
+
+
+def pasta_exportacoes():
+    """Pasta das exportações (lida na hora, depois do load_dotenv dos apps)."""
+    return os.getenv(PASTA_EXPORTACOES_ENV) or PASTA_PADRAO
+
+EXPORTACOES = {
+    'compras_confra': {
+        'titulo': "Confra 2025",
+        'tabela': "compra_confra",
+        'filtros': filtro_edicao(EDICAO_CONFRA),
+        'separador': ",",
+        'colunas': [
+            "id", "created_at", "nome_comprador", "email_comprador", "whatsapp_comprador",
+            "qtd_confra", "qtd_copo", "nomes_copo", "nomes_participantes", "documentos_participantes",
+            "valor_pix", "valor_credito", "tipo_compra", "e_crianca", "link_pagamento",
+        ],
+    },
+    'compras_ingressos': {
+        'titulo': "Festa Chapiuski",
+        'tabela': "compra_ingressos",
+        'filtros': filtro_edicao(EDICAO_FESTA),
+        'separador': ",",
+        'colunas': ["id", "datahora", "email", "quantidade", "nomes", "documentos", "lote"],
+    },
+    'historico_vendas': {
+        'titulo': "Camisetas e Bonés 2026",
+        'tabela': "compra_confra",
+        'filtros': filtro_edicao(EDICAO_CAMISETAS),
+        'separador': ";",
+        'colunas': [
+            'id', 'created_at', 'nome_comprador', 'whatsapp_comprador', 'email_comprador',
+            'qtd_bone_avulso', 'qtd_confort', 'qtd_over', 'valor_total',
+            'confort_1_arte', 'confort_1_tam', 'confort_2_arte', 'confort_2_tam',
+            'over_1_arte', 'over_1_tam', 'over_2_arte', 'over_2_tam',
+        ],
+    },
+}
+
+log = logging.getLogger("exportacao_pedidos")
+
+_lock = threading.Lock()
+
+
+def caminho_exportacao(nome, pasta=None):
+    return os.path.join(pasta or pasta_exportacoes(), f"{nome}.csv")
+
+
+def _caminho_resumo(nome, pasta):
+    return os.path.join(pasta or pasta_exportacoes(), f"{nome}.resumo.json")
+
+
+def _linhas_csv(linhas, exportacao):
+    """Linhas (dicts) formatadas como CSV, só com as colunas da exportação e na ordem dela."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=exportacao['separador'])
+    for linha in linhas:
+        escritor.writerow(["" if linha.get(coluna) is None else linha[coluna] for coluna in exportacao['colunas']])
+    return buffer.getvalue()
+
+
+def _cabecalho(exportacao):
+    return exportacao['separador'].join(exportacao['colunas']) + "\r\n"
+
+
+# --- REGISTRO (FORMULÁRIOS) ---
+
+def registrar_pedido(nome, linha, pasta=None):
+    """Acrescenta o pedido recém-inserido (a linha devolvida pelo insert) ao CSV da exportação."""
+    exportacao = EXPORTACOES[nome]
+    caminho = caminho_exportacao(nome, pasta)
+    with _lock:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        novo = not os.path.exists(caminho)
+        with open(caminho, "a", encoding="utf-8", newline="") as arquivo:
+            if novo:
+                arquivo.write("\ufeff" + _cabecalho(exportacao))  # BOM para o Excel abrir em UTF-8
+            arquivo.write(_linhas_csv([linha], exportacao))
+
+
+def conteudo(nome, pasta=None):
+    """Bytes do CSV completo da exportação (para o botão de download), ou None se ainda não existe."""
+    try:
+        with open(caminho_exportacao(nome, pasta), "rb") as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return None
+
+
+def conteudo_ou_reconstruir(cliente, nome, pasta=None):
+    """Como conteudo(), mas refaz o CSV pelo Supabase quando ele não existe nesta
+    pasta (ex.: painel numa máquina diferente da dos formulários)."""
+    dados = conteudo(nome, pasta)
+    if dados is None:
+        reconstruir(cliente, nome, pasta)
+        dados = conteudo(nome, pasta)
+    return dados
+
+
+def reconstruir(cliente, nome, pasta=None):
+    """Refaz o CSV a partir do Supabase e marca tudo como já resumido. Retorna o número de pedidos."""
+    exportacao = EXPORTACOES[nome]
+    df = buscar_tabela_paginada(cliente, exportacao['tabela'], filtros=exportacao['filtros'])
+    linhas = df.to_dict('records') if not df.empty else []
+
+    caminho = caminho_exportacao(nome, pasta)
+    with _lock:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8", newline="") as arquivo:
+            arquivo.write("\ufeff" + _cabecalho(exportacao) + _linhas_csv(linhas, exportacao))
+        os.replace(temporario, caminho)
+        _gravar_resumo(nome, os.path.getsize(caminho), pasta)
+    return len(linhas)
+
+
+# --- RESUMO PERIÓDICO ---
+
+def _ler_resumo(nome, pasta):
+    try:
+        with open(_caminho_resumo(nome, pasta), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'posicao': 0, 'enviado_em': None}
+
+
+def _gravar_resumo(nome, posicao, pasta):
+    caminho = _caminho_resumo(nome, pasta)
+    with open(f"{caminho}.tmp", "w", encoding="utf-8") as arquivo:
+        json.dump({'posicao': posicao, 'enviado_em': datetime.now().isoformat(timespec='seconds')}, arquivo)
+    os.replace(f"{caminho}.tmp", caminho)
+
+
+def pedidos_novos(nome, pasta=None):
+    """(bytes das linhas acrescentadas desde o último resumo, posição final) — lê só o trecho novo."""
+    posicao = _ler_resumo(nome, pasta)['posicao']
+    try:
+        with open(caminho_exportacao(nome, pasta), "rb") as arquivo:
+            if posicao == 0:
+                arquivo.readline()  # primeiro resumo: pula o cabeçalho
+                posicao = arquivo.tell()
+            arquivo.seek(posicao)
+            trecho = arquivo.read()
+    except FileNotFoundError:
+        return b"", 0
+    # Só linhas completas (um formulário pode estar escrevendo agora)
+    fim = trecho.rfind(b"\n") + 1
+    return trecho[:fim], posicao + fim
+
+
+def enviar_resumo(nome, remetente, destinatarios, pasta=None):
+    """Enfileira o e-mail de resumo com os pedidos novos da exportação. Retorna quantos foram."""
+    exportacao = EXPORTACOES[nome]
+    novos, posicao = pedidos_novos(nome, pasta)
+    if not novos:
+        return 0
+
+    total = sum(1 for _ in csv.reader(io.StringIO(novos.decode("utf-8")), delimiter=exportacao['separador']))
+    desde = _ler_resumo(nome, pasta)['enviado_em']
+    desde = f" desde {datetime.fromisoformat(desde):%d/%m/%Y %H:%M}" if desde else ""
+    corpo = (
+        f"{total} pedido(s) novo(s) de {exportacao['titulo']}{desde}, em anexo.\n\n"
+        "A planilha completa pode ser baixada no Painel de Vendas (menu lateral, 'Planilhas de pedidos')."
+    )
+    anexo = ("\ufeff" + _cabecalho(exportacao)).encode("utf-8") + novos
+    caixa_saida.enviar_email(
+        remetente, destinatarios, f"Resumo de pedidos - {exportacao['titulo']}",
+        texto=corpo, anexos=[(f"{nome}_novos_{datetime.now():%Y%m%d_%H%M}.csv", anexo)]
+    )
+    _gravar_resumo(nome, posicao, pasta)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo periódico dos pedidos novos para a organização.")
+    parser.add_argument("--intervalo", type=float, help="horas entre resumos (sem ele, envia uma vez e sai)")
+    parser.add_argument("--reconstruir", action="store_true", help="refaz os CSVs a partir do Supabase")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.reconstruir:
+        cliente = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+        for nome in EXPORTACOES:
+            log.info("%s: %s pedido(s).", nome, reconstruir(cliente, nome))
+        return
+
+    remetente = os.getenv("EMAIL_REMETENTE")
+    destinatarios = [d.strip() for d in os.getenv("EMAIL_DESTINATARIO", "").split(",") if d.strip()]
+    while True:
+        for nome in EXPORTACOES:
+            total = enviar_resumo(nome, remetente, destinatarios)
+            if total:
+                log.info("%s: resumo com %s pedido(s) na caixa de saída.", nome, total)
+        # O resumo só vai para a fila; entrega o que estiver vencido antes de sair/dormir
+        caixa_saida.entregar_pendentes()
+        correio.pool().fechar()
+        if not args.intervalo:
+            break
+        time.sleep(args.intervalo * 3600)
+
+
+if __name__ == "__main__":
+    main()
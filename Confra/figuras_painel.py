@@ -0,0 +1,320 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from processamento_painel import (
+    DIAS_SEMANA_PT, derivados_camisas, derivados_confra, derivados_festa,
+    histograma_dia_hora, versao_dados
+)
+
+# Montagem das figuras Plotly do painel: o painel exibe o que estas funções
+# retornam e o worker (worker_painel.py) grava o mesmo resultado, em JSON, no
+# snapshot. Cada figuras_* devolve {id do gráfico: figura}.
+
+# --- CACHE DE FIGURAS (LRU) ---
+# Montar uma figura com plotly.express custa dezenas de ms; reaproveitá-la custa só
+# a serialização. Cada figura fica guardada pela chave (id do gráfico, versão dos
+# dados de origem), compartilhada entre sessões: um rerun só remonta os gráficos
+# cujos dados mudaram. As menos usadas saem quando o cache passa do limite.
+LIMITE_CACHE_FIGURAS = 48
+
+@st.cache_resource
+def cache_figuras():
+    """Figuras já montadas, da menos para a mais recentemente usada."""
+    return {'lock': threading.Lock(), 'figuras': OrderedDict()}
+
+
+def figura_em_cache(id_grafico, versao, montar, *args):
+    """Figura `id_grafico` para a versão `versao` dos dados; só chama montar(*args) se ela não estiver no cache.
+    A figura devolvida é compartilhada: quem a recebe só a exibe, sem alterá-la."""
+    cache = cache_figuras()
+    chave = (id_grafico, versao)
+    with cache['lock']:
+        if chave in cache['figuras']:
+            cache['figuras'].move_to_end(chave)
+            return cache['figuras'][chave]
+
+    figura = montar(*args)
+    with cache['lock']:
+        cache['figuras'][chave] = figura
+        cache['figuras'].move_to_end(chave)
+        while len(cache['figuras']) > LIMITE_CACHE_FIGURAS:
+            cache['figuras'].popitem(last=False)
+    return figura
+
+
+# --- MONTAGEM DAS FIGURAS ---
+
+def figura_mapa_calor(evento, datas, titulo, rotulo_z):
+    """Histograma dia x hora de um evento como um go.Heatmap simples."""
+    matriz = histograma_dia_hora(evento, versao_dados(datas), datas)
+    fig = go.Figure(go.Heatmap(
+        z=matriz,
+        x=list(range(24)),
+        y=DIAS_SEMANA_PT,
+        colorscale='Reds',
+        colorbar=dict(title=rotulo_z),
+        hovertemplate='Dia: %{y}<br>Hora: %{x}h<br>' + rotulo_z + ': %{z}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title='Hora do Dia',
+        yaxis_title='Dia da Semana',
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
+
+
+def _confra_acumulada(versao, df_confra):
+    """Arrecadação acumulada da Confra por dia."""
+    vendas_dia_confra, _ = derivados_confra(versao, df_confra)
+    return px.line(
+        vendas_dia_confra,
+        x='data_pedido',
+        y='acumulado',
+        title="📈 Arrecadação Acumulada da Confra (PIX)",
+        labels={'data_pedido': 'Data do Pedido', 'acumulado': 'Arrecadado Total Acumulado (R$)'},
+        markers=True
+    )
+
+
+def _confra_resumo(versao, df_confra, total_ingressos_pagantes, total_criancas_gratis, total_copos):
+    """Resumo quantitativo da Confra em 4 barras (copos, ingressos, kits e crianças)."""
+    _, total_kits_transactions = derivados_confra(versao, df_confra)
+
+    # 1. Quantidades base
+    total_ingressos = total_ingressos_pagantes + total_criancas_gratis
+
+    df_bar_data = pd.DataFrame({
+        'Métrica': ['Qtd. Copos', 'Qtd. Ingressos', 'Qtd. Kits (Pedidos)', 'Qtd. Crianças'],
+        'Quantidade': [total_copos, total_ingressos, total_kits_transactions, total_criancas_gratis],
+        'Cor': ['Copos', 'Ingressos', 'Kits', 'Crianças'] # Para cores consistentes
+    })
+
+    # Simple bar chart for the four metrics
+    fig_confra_bar = px.bar(
+        df_bar_data,
+        x='Métrica',
+        y='Quantidade',
+        color='Cor',
+        title='Resumo Quantitativo de Itens da Confra',
+        labels={'Métrica': 'Métrica', 'Quantidade': 'Quantidade Total'},
+        color_discrete_map={'Copos': '#1f77b4', 'Ingressos': '#55A868', 'Kits': '#C44E52', 'Crianças': '#ff9900'},
+        text='Quantidade'
+    )
+    fig_confra_bar.update_traces(textposition='outside')
+    fig_confra_bar.update_layout(xaxis={'categoryorder':'array', 'categoryarray': ['Qtd. Copos', 'Qtd. Ingressos', 'Qtd. Kits (Pedidos)', 'Qtd. Crianças']})
+    return fig_confra_bar
+
+
+def figuras_confra(dados):
+    """Arrecadação acumulada e resumo quantitativo da Confra."""
+    (total_ingressos_pagantes, total_criancas_gratis, total_copos,
+     _, df_confra, _, _) = dados['compra_confra']
+    if df_confra.empty:
+        return {}
+
+    versao = versao_dados(df_confra)
+    return {
+        'confra_acumulada': figura_em_cache('confra_acumulada', versao, _confra_acumulada, versao, df_confra),
+        'confra_resumo': figura_em_cache(
+            'confra_resumo', versao, _confra_resumo,
+            versao, df_confra, total_ingressos_pagantes, total_criancas_gratis, total_copos
+        ),
+    }
+
+
+def _camisas_tipo(versao, df_camisas_expanded):
+    """Gráfico de pizza: distribuição por tipo de camisa."""
+    df_tipo, _, _, _ = derivados_camisas(versao, df_camisas_expanded)
+    return px.pie(
+        df_tipo,
+        values='count',
+        names='tipo_individual',
+        title="📊 Distribuição por Tipo de Camisa",
+        color_discrete_map={'Jogador': 'gold', 'Torcedor': 'black'}
+    )
+
+
+def _camisas_tamanho(versao, df_camisas_expanded):
+    """Gráfico de barras: vendas por tamanho, compostas por tipo."""
+    _, df_tamanho, _, _ = derivados_camisas(versao, df_camisas_expanded)
+    tamanhos_ordem = ["P", "M", "G", "GG", "G1", "G2", "G3", "G4", "G5"]
+    return px.bar(
+        df_tamanho,
+        x='tamanho_individual',
+        y='count',
+        color = 'tipo_individual',
+        title="📏 Composição de Vendas por Tamanho",
+        labels={'tamanho_individual': 'Tamanho', 'count': 'Quantidade Vendida', 'tipo_individual': 'Tipo de Camisa'},
+        category_orders={'tamanho_individual': tamanhos_ordem}
+    )
+
+
+def _camisas_numeros(versao, df_camisas_expanded):
+    """Gráfico de barras: quantidade vendida por número da camisa."""
+    _, _, df_numeros, _ = derivados_camisas(versao, df_camisas_expanded)
+    fig_numeros = px.bar(
+        df_numeros,
+        x = 'numero_individual',
+        y = 'count',
+        title = '#️⃣ Números Mais Pedidos nas Camisas',
+        labels = {'numero_individual': 'Número da Camisa', 'count': 'Quantidade de Pedidos'}
+    )
+    fig_numeros.update_xaxes(type='category')
+    return fig_numeros
+
+
+def _camisas_acumulada(versao, df_camisas_expanded):
+    """Gráfico de linha: camisas vendidas acumuladas ao longo do tempo."""
+    _, _, _, vendas_por_dia = derivados_camisas(versao, df_camisas_expanded)
+    return px.line(
+        vendas_por_dia,
+        x='data_pedido',
+        y='acumulada',
+        title="📈 Vendas Acumuladas de Camisas ao Longo do Tempo",
+        labels={'data_pedido': 'Data do Pedido', 'acumulada': 'Total de Camisas Vendidas'},
+        markers=True
+    )
+
+
+def figuras_camisas(dados):
+    """Tipo, tamanho, números, vendas acumuladas e mapa de calor das Camisas."""
+    df_camisas_expanded = dados['compra_camisas']
+    if df_camisas_expanded is None or df_camisas_expanded.empty:
+        return {}
+
+    versao = versao_dados(df_camisas_expanded)
+    figuras = {
+        id_grafico: figura_em_cache(id_grafico, versao, montar, versao, df_camisas_expanded)
+        for id_grafico, montar in (
+            ('camisas_tipo', _camisas_tipo),
+            ('camisas_tamanho', _camisas_tamanho),
+            ('camisas_numeros', _camisas_numeros),
+            ('camisas_acumulada', _camisas_acumulada),
+        )
+    }
+    # Heatmap: Vendas por Hora e Dia da Semana (Camisas) - MANTIDO PARA DETALHE DO EVENTO
+    figuras['camisas_mapa_calor'] = figura_em_cache(
+        'camisas_mapa_calor', versao, figura_mapa_calor,
+        'camisas', df_camisas_expanded['data_pedido'], "🔥 Mapa de Calor - Horários de Pico de Vendas (Camisas)", "Vendas"
+    )
+    return figuras
+
+
+def _festa_acumulada(versao, df_festa_expanded):
+    """Gráfico de linha: ingressos da Festa vendidos acumulados por dia."""
+    venda_por_dia = derivados_festa(versao, df_festa_expanded)
+    return px.line(
+        venda_por_dia,
+        x='datahora',
+        y='acumulada',
+        title="📈 Venda Acumulada de Ingressos",
+        labels={'datahora': 'Data', 'acumulada': 'Ingressos Acumulados'},
+        markers=True
+    )
+
+
+def figuras_festa(dados):
+    """Venda acumulada e mapa de calor da Festa 2026."""
+    resultados_festa_kpis = dados['compra_ingressos']
+    if resultados_festa_kpis is None:
+        return {}
+
+    df_festa_expanded = resultados_festa_kpis[5]
+    versao = versao_dados(df_festa_expanded)
+    return {
+        'festa_acumulada': figura_em_cache('festa_acumulada', versao, _festa_acumulada, versao, df_festa_expanded),
+        # 🔥 Heatmap Hora x Dia da Semana - MANTIDO PARA DETALHE DO EVENTO
+        'festa_mapa_calor': figura_em_cache(
+            'festa_mapa_calor', versao, figura_mapa_calor,
+            'festa', df_festa_expanded['datahora'], "🔥 Mapa de Calor - Vendas por Hora e Dia da Semana", "Vendas"
+        ),
+    }
+
+
+def _analises_arrecadacao(df_arrecadacao):
+    """Barras da arrecadação total por evento."""
+    return px.bar(
+        df_arrecadacao,
+        x='Evento',
+        y='Arrecadação (R$)',
+        title='💰 Arrecadação Total por Evento',
+        color='Evento',
+        color_discrete_sequence=['#4C72B0', '#55A868', '#C44E52']
+    )
+
+
+def _analises_crescimento(compras_cumulativas):
+    """Área do crescimento acumulado de compradores (e-mail único)."""
+    return px.area(
+        compras_cumulativas,
+        x='data_dia',
+        y='participantes_acumulados',
+        title='📈 Crescimento Acumulado de Compradores (Baseado em Email Único)',
+        labels={'data_dia': 'Data', 'participantes_acumulados': 'Compradores Acumulados'}
+    )
+
+
+def _analises_clusters(df_heatmap, K):
+    """Heatmap da média de cada característica por cluster (segmentação K-Means)."""
+    fig_cluster_heatmap = go.Figure(data=go.Heatmap(
+        z=df_heatmap.values,
+        x=df_heatmap.columns,
+        y=df_heatmap.index,
+        colorscale='YlOrRd',
+        # O próprio Plotly escreve a média em cada célula, com cor de texto contrastando com a célula
+        texttemplate='%{z:.2f}',
+        hovertemplate='Cluster: %{x}<br>Característica: %{y}<br>Média: %{z:.2f}<extra></extra>'
+    ))
+
+    fig_cluster_heatmap.update_layout(
+        title=f"Média das Características por Cluster (K={K})",
+        xaxis_title="Cluster",
+        yaxis_title="Característica",
+        height=400,
+        xaxis=dict(tickmode='array', tickvals=list(range(len(df_heatmap.columns))), ticktext=df_heatmap.columns)
+    )
+    return fig_cluster_heatmap
+
+
+def figuras_analises(analises):
+    """Arrecadação por evento, crescimento de compradores, mapa de calor consolidado
+    e médias por cluster, a partir do resultado de calcular_analises_avancadas."""
+    if analises is None:
+        return {}
+
+    versao = analises['versao']
+    figuras = {
+        'analises_arrecadacao': figura_em_cache('analises_arrecadacao', versao, _analises_arrecadacao, analises['arrecadacao']),
+        'analises_crescimento': figura_em_cache('analises_crescimento', versao, _analises_crescimento, analises['crescimento']),
+    }
+
+    # 4. MAPA DE CALOR CONSOLIDADO
+    datas_pedidos = analises['datas_pedidos']
+    if not datas_pedidos.empty:
+        figuras['analises_mapa_calor'] = figura_em_cache(
+            'analises_mapa_calor', versao, figura_mapa_calor,
+            'consolidado', datas_pedidos, "Períodos de Pico de Compra (Todos os Eventos)", "Nº de Pedidos"
+        )
+
+    if analises['medias_cluster'] is not None:
+        figuras['analises_clusters'] = figura_em_cache(
+            'analises_clusters', versao, _analises_clusters, analises['medias_cluster'], analises['K']
+        )
+
+    return figuras
+
+
+# Montador de cada seção do painel: as seções de eventos recebem os dados
+# processados ({tabela: resultado}); a de análises, o dicionário das análises.
+MONTADORES = {
+    'confra': figuras_confra,
+    'camisas': figuras_camisas,
+    'festa': figuras_festa,
+    'analises': figuras_analises,
+}
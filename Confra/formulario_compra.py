@@ -1,18 +1,17 @@
 import os
 import re
-import smtplib
 import time
 from datetime import datetime
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email import encoders
 
 import streamlit as st
-import pandas as pd
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+import caixa_saida
+import exportacao_pedidos
+from edicoes import EDICAO_CONFRA
+from estoque import abrir_estoque
+
 # ==== Configuração da Página (DEVE SER O PRIMEIRO COMANDO STREAMLIT) ====
 st.set_page_config(
     layout="centered",
@@ -38,11 +37,11 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # Configurações de E-mail
 EMAIL_REMETENTE = os.getenv("EMAIL_REMETENTE")
-EMAIL_SENHA = os.getenv("EMAIL_SENHA")
 EMAIL_DESTINATARIO = os.getenv("EMAIL_DESTINATARIO") # E-mails da organização (admin)
 
-# Arquivo CSV para backup local
-arquivo_csv = os.path.join(os.path.dirname(__file__), "compras_confra.csv")
+# Os e-mails saem pela caixa de saída: um entregador por processo, em segundo plano
+# (a senha EMAIL_SENHA e o servidor SMTP são lidos do ambiente por ele)
+caixa_saida.iniciar_entregador()
 
 # ==== Constantes e Mapeamentos do Aplicativo ====
 PRECOS_PIX = {
@@ -88,25 +87,19 @@ ESTOQUE_MAX_CONFRA = 100
 ESTOQUE_MAX_COPO = 100
 LIMITE_POR_PEDIDO = 3 # Limite de ingressos/copos por tipo por pedido
 
-# === Função para buscar total de ingressos vendidos (Simplificada, pois não há lotes) ===
-@st.cache_data(ttl=600) # Armazena o resultado por 10 minutos
-def buscar_total_vendido():
-    """Busca o total de ingressos (Confra) e Copos vendidos no Supabase."""
-    try:
-        # Nota: A tabela no Supabase deve se chamar "compra_confra" conforme a refatoração anterior
-        response = supabase.table("compra_confra").select("qtd_confra", "qtd_copo").execute()
-        if response.data:
-            total_confra = sum(item["qtd_confra"] for item in response.data)
-            total_copo = sum(item["qtd_copo"] for item in response.data)
-            return total_confra, total_copo
-        return 0, 0
-    except Exception as e:
-        # st.error(f"Erro ao buscar estoque no banco de dados: {e}") # Comentar para não poluir o app
-        return 0, 0
-
-total_confra_vendidos, total_copo_vendidos = buscar_total_vendido()
-estoque_disponivel_confra = max(0, ESTOQUE_MAX_CONFRA - total_confra_vendidos)
-estoque_disponivel_copo = max(0, ESTOQUE_MAX_COPO - total_copo_vendidos)
+# === Estoque (contadores atômicos por item, ver estoque.py) ===
+# Ler o disponível é uma consulta de uma linha por item, exata a cada visita;
+# o pedido é gravado junto com a reserva das quantidades (tudo-ou-nada).
+LIMITES_ESTOQUE = {'confra': ESTOQUE_MAX_CONFRA, 'copo': ESTOQUE_MAX_COPO}
+estoque = abrir_estoque(supabase)
+
+try:
+    disponivel = estoque.disponivel(EDICAO_CONFRA, LIMITES_ESTOQUE)
+except Exception:
+    # Sem leitura, mostra o limite cheio: a reserva na hora do pedido ainda barra o excesso
+    disponivel = dict(LIMITES_ESTOQUE)
+estoque_disponivel_confra = disponivel['confra']
+estoque_disponivel_copo = disponivel['copo']
 
 # ==== Funções Auxiliares (Reutilizadas e adaptadas) ====
 def email_valido(email):
@@ -122,67 +115,6 @@ def whatsapp_valido(whatsapp):
         return len(numeros) >= 10
     return False
 
-def enviar_email_notificacao(remetente, senha, destinatarios, assunto, corpo, comprovante, caminho_csv=None):
-    """Envia o e-mail de notificação para o admin com todos os anexos."""
-    msg = MIMEMultipart()
-    msg['Subject'] = assunto
-    msg['From'] = remetente
-    msg['To'] = ", ".join(destinatarios)
-    msg.attach(MIMEText(corpo, 'plain', 'utf-8'))
-
-    # Anexa o comprovante de pagamento
-    if comprovante is not None:
-        part_comprovante = MIMEBase('application', "octet-stream")
-        part_comprovante.set_payload(comprovante.getvalue())
-        encoders.encode_base64(part_comprovante)
-        part_comprovante.add_header('Content-Disposition', f'attachment; filename="{comprovante.name}"')
-        msg.attach(part_comprovante)
-
-    # Anexa o arquivo CSV com todos os pedidos
-    if caminho_csv and os.path.exists(caminho_csv):
-        with open(caminho_csv, "rb") as attachment:
-            part_csv = MIMEBase('application', "octet-stream")
-            part_csv.set_payload(attachment.read())
-            encoders.encode_base64(part_csv)
-            part_csv.add_header('Content-Disposition', f'attachment; filename="{os.path.basename(caminho_csv)}"')
-            msg.attach(part_csv)
-
-    # Envio do e-mail
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(remetente, senha)
-        server.sendmail(remetente, destinatarios, msg.as_string())
-
-def enviar_email_para_comprador(remetente, senha, destinatario, assunto, corpo):
-    """Envia um e-mail simples de confirmação para o comprador, sem anexos."""
-    msg = MIMEMultipart()
-    msg['Subject'] = assunto
-    msg['From'] = remetente
-    msg['To'] = destinatario
-    msg.attach(MIMEText(corpo, 'html', 'utf-8')) # Usando HTML para melhor formatação
-
-    # Envio do e-mail
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(remetente, senha)
-        server.sendmail(remetente, destinatario, msg.as_string())
-
-def sincronizar_csv_com_supabase(nome_tabela, caminho_csv):
-    """Sincroniza os dados do Supabase para o CSV local."""
-    try:
-        response = supabase.table(nome_tabela).select("*").order("created_at", desc=True).execute()
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df.to_csv(caminho_csv, index=False, encoding="utf-8-sig")
-            return caminho_csv
-        else:
-            # Colunas ajustadas para refletir a lista de nomes no copo
-            colunas = ["nome_comprador", "email_comprador", "whatsapp_comprador", "qtd_confra", "qtd_copo", "nomes_copo", "valor_pix", "valor_credito", "link_pagamento", "nomes_participantes", "documentos_participantes", "e_crianca", "created_at"] # Coluna 'e_crianca' adicionada
-            df = pd.DataFrame(columns=colunas)
-            df.to_csv(caminho_csv, index=False, encoding="utf-8-sig")
-            return caminho_csv
-    except Exception as e:
-        st.error(f"❌ Erro ao sincronizar CSV com Supabase: {e}")
-        return None
-
 # ==== Interface do Streamlit ====
 st.markdown("<h1 style='text-align: center;'>Confra 2025 - Chapiuski</h1>", unsafe_allow_html=True)
 st.markdown("<h4 style='text-align: center; color: #333;'>Ingressos e Copos Personalizados</h4>", unsafe_allow_html=True)
@@ -540,7 +472,7 @@ if finalizar_btn or nova_compra_btn:
             try:
                 datahora = datetime.now().isoformat()
 
-                # --- Salva no Supabase ---
+                # --- Salva no Supabase, reservando o estoque no mesmo passo ---
                 dados_para_supabase = {
                     "nome_comprador": nome_comprador,
                     "email_comprador": email_comprador,
@@ -557,12 +489,23 @@ if finalizar_btn or nova_compra_btn:
                     "nomes_participantes": ", ".join(nomes_participantes), 
                     "documentos_participantes": ", ".join(documentos_participantes),
                     "e_crianca": ", ".join(flags_crianca_str), 
-                    "created_at": datahora
+                    "created_at": datahora,
+                    "edicao": EDICAO_CONFRA
                 }
-                supabase.table("compra_confra").insert(dados_para_supabase).execute()
-
-                # --- Gera CSV atualizado ---
-                caminho_csv = sincronizar_csv_com_supabase("compra_confra", arquivo_csv)
+                itens_pedido = {'confra': qtd_confra_total, 'copo': qtd_copo}
+                pedido_gravado = estoque.inserir_pedido(dados_para_supabase, itens_pedido, LIMITES_ESTOQUE)
+                if pedido_gravado is None:
+                    # Outro pedido levou as últimas unidades: nada foi gravado nem reservado
+                    st.error("❌ O estoque acabou enquanto você preenchia o pedido. Recarregue a página para ver as quantidades disponíveis.")
+                    st.stop()
+                # Os QR Codes dos ingressos só são enviados depois que a organização
+                # confirma o pagamento (admin_ingressos.py -> ingressos_qr.confirmar_pedidos)
+
+                # --- Acrescenta só este pedido à planilha da organização (exportacao_pedidos.py) ---
+                try:
+                    exportacao_pedidos.registrar_pedido("compras_confra", pedido_gravado)
+                except OSError as e:
+                    st.warning(f"⚠️ Pedido salvo, mas não foi possível atualizar a planilha local ({e}).")
 
                 # Prepara detalhes para o e-mail do ADMIN
                 detalhes_participantes_email = "\n".join([f"  - Participante {i+1}: Nome '{nomes_participantes[i]}', Doc. {documentos_participantes[i]}, Criança: {flags_crianca_str[i]}" for i in range(qtd_confra_total)])
@@ -594,10 +537,13 @@ NOMES NOS COPOS:
 PARTICIPANTES (Ingressos):
 {detalhes_participantes_email if qtd_confra_total > 0 else 'Nenhum participante registrado.'}
 
-O comprovante de pagamento e o CSV atualizado de todos os pedidos estão em anexo.
+O comprovante de pagamento está em anexo. A planilha com todos os pedidos fica no
+Painel de Vendas, e os pedidos novos chegam no resumo periódico.
 Verifique o pagamento para confirmar o pedido.
 """
-                enviar_email_notificacao(EMAIL_REMETENTE, EMAIL_SENHA, destinatarios_admin, assunto_admin, corpo_admin, comprovante, caminho_csv)
+                # Só o comprovante em anexo; o envio fica com a caixa de saída (caixa_saida.py)
+                anexos_admin = [(comprovante.name, comprovante.getvalue())]
+                caixa_saida.enviar_email(EMAIL_REMETENTE, destinatarios_admin, assunto_admin, texto=corpo_admin, anexos=anexos_admin)
 
                 # --- 2. Prepara e envia e-mail para o COMPRADOR ---
                 primeiro_nome = nome_comprador.split()[0]
@@ -634,6 +580,7 @@ Verifique o pagamento para confirmar o pedido.
                         {detalhes_participantes_html if qtd_confra_total > 0 else '<li>Nenhum participante registrado.</li>'}
                     </ul>
 
+                    {'<p>🎟️ <b>Os QR Codes dos ingressos</b> (um por participante) serão enviados por e-mail assim que o pagamento for confirmado. Apresente-os na entrada junto com o documento.</p>' if qtd_confra_total > 0 else ''}
                     <p>✅ **Valor Calculado:** O valor final de R$ {preco_pix:,.2f} (PIX) já reflete que as {qtd_criancas} criança(s) indicada(s) acima não pagam ingresso.</p>
                     <hr>
                     <p>Obrigado! Você já faz parte da nossa história!</p>
@@ -641,7 +588,7 @@ Verifique o pagamento para confirmar o pedido.
                  </body>
                 </html>
                 """
-                enviar_email_para_comprador(EMAIL_REMETENTE, EMAIL_SENHA, email_comprador, assunto_comprador, corpo_comprador)
+                caixa_saida.enviar_email(EMAIL_REMETENTE, [email_comprador], assunto_comprador, html=corpo_comprador)
 
                 # --- Mensagem de sucesso para o usuário ---
                 if finalizar_btn:
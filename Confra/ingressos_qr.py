@@ -0,0 +1,238 @@
+import base64
+import hashlib
+import hmac
+import io
+import multiprocessing
+import os
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+
+import caixa_saida
+from edicoes import COLUNA_EDICAO, EDICAO_CONFRA, EDICAO_FESTA, filtro_edicao
+from leitura_supabase import buscar_tabela_paginada
+
+# Ingressos com QR Code assinado: cada participante recebe um código
+#   CHP1.<evento>.<pedido>.<assento>.<crianca>.<assinatura>
+# onde a assinatura é um HMAC-SHA256 (truncado, base64url) dos campos anteriores
+# com o segredo INGRESSO_QR_SEGREDO. Na porta basta recalcular o HMAC: a
+# validação não consulta banco nenhum e funciona sem internet.
+# Os códigos só são emitidos para pedidos com pagamento confirmado (coluna
+# `pagamento`, ver sql/pagamento_pedidos.sql): a organização confirma ou cancela
+# os pedidos em admin_ingressos.py (com senha), e validar_ingresso.py guarda a
+# situação de cada pedido no espelho offline para a porta recusar códigos de
+# pedidos não confirmados.
+VERSAO = "CHP1"
+SEGREDO_ENV = "INGRESSO_QR_SEGREDO"
+TAMANHO_ASSINATURA = 22  # caracteres base64url (~132 bits)
+
+COLUNA_PAGAMENTO = "pagamento"
+PAGAMENTO_PENDENTE = "pendente"
+PAGAMENTO_CONFIRMADO = "confirmado"
+PAGAMENTO_CANCELADO = "cancelado"
+
+# Código do evento no QR -> nome usado no check-in (checkin_offline), tabela e edição de origem
+EVENTOS = {
+    'C': {'nome': 'Confra', 'tabela': 'compra_confra', 'edicao': EDICAO_CONFRA, 'qtd': 'qtd_confra', 'nomes': 'nomes_participantes', 'email': 'email_comprador'},
+    'F': {'nome': 'Festa 2026', 'tabela': 'compra_ingressos', 'edicao': EDICAO_FESTA, 'qtd': 'quantidade', 'nomes': 'nomes', 'email': 'email'},
+}
+
+# Abaixo disso os QR Codes são gerados no próprio processo (um pedido tem no
+# máximo poucos ingressos e subir um pool custaria mais que desenhá-los).
+LIMIAR_POOL = 16
+MAX_WORKERS = 4
+
+
+def _segredo(segredo=None):
+    segredo = segredo or os.getenv(SEGREDO_ENV)
+    if not segredo:
+        raise RuntimeError(f"Variável de ambiente {SEGREDO_ENV} não configurada.")
+    return segredo.encode('utf-8')
+
+
+def _assinatura(mensagem, segredo):
+    digest = hmac.new(segredo, mensagem.encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode('ascii')[:TAMANHO_ASSINATURA]
+
+
+def assinar_ingresso(evento, pedido_id, assento, crianca=False, segredo=None):
+    """Código assinado de um ingresso. `assento` é a posição do participante no pedido
+    (0, 1, 2...), a mesma usada na chave "pedido-assento" do check-in."""
+    mensagem = f"{VERSAO}.{evento}.{int(pedido_id)}.{int(assento)}.{int(bool(crianca))}"
+    return f"{mensagem}.{_assinatura(mensagem, _segredo(segredo))}"
+
+
+def verificar_ingresso(codigo, segredo=None):
+    """Confere a assinatura de um código lido na porta, sem acessar banco.
+    Retorna {'valido': bool, 'motivo': str} e, se válido, evento/pedido/assento/crianca/chave."""
+    partes = (codigo or '').strip().split('.')
+    if len(partes) != 6 or partes[0] != VERSAO:
+        return {'valido': False, 'motivo': "Formato de código desconhecido."}
+
+    versao, evento, pedido, assento, crianca, assinatura = partes
+    if evento not in EVENTOS or not (pedido.isdigit() and assento.isdigit() and crianca in ('0', '1')):
+        return {'valido': False, 'motivo': "Código com campos inválidos."}
+
+    esperada = _assinatura('.'.join(partes[:5]), _segredo(segredo))
+    if not hmac.compare_digest(esperada, assinatura):
+        return {'valido': False, 'motivo': "Assinatura inválida (ingresso falso ou adulterado)."}
+
+    return {
+        'valido': True,
+        'motivo': "",
+        'evento': EVENTOS[evento]['nome'],
+        'pedido': int(pedido),
+        'assento': int(assento),
+        'crianca': crianca == '1',
+        'chave': f"{int(pedido)}-{int(assento)}",
+    }
+
+
+# --- GERAÇÃO DAS IMAGENS ---
+
+def renderizar_png(codigo):
+    """PNG do QR Code de um código (função de módulo para poder rodar no pool de processos)."""
+    buffer = io.BytesIO()
+    qrcode.make(codigo, border=2).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def renderizar_qrcodes(codigos, max_workers=MAX_WORKERS):
+    """PNGs de vários códigos, na mesma ordem. Lotes grandes vão para um pool de
+    processos (spawn, para não herdar as threads do servidor do Streamlit)."""
+    codigos = list(codigos)
+    if len(codigos) < LIMIAR_POOL:
+        return [renderizar_png(codigo) for codigo in codigos]
+
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto) as pool:
+        return list(pool.map(renderizar_png, codigos, chunksize=max(len(codigos) // (max_workers * 4), 1)))
+
+
+def _nome_arquivo(evento, pedido_id, assento, nome):
+    nome_ascii = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode('ascii')
+    nome_limpo = re.sub(r'[^0-9A-Za-z]+', '_', nome_ascii).strip('_')[:40] or 'participante'
+    return f"ingresso_{EVENTOS[evento]['nome'].split()[0].lower()}_{pedido_id}_{assento + 1}_{nome_limpo}.png"
+
+
+def anexos_ingressos(evento, pedido_id, nomes, criancas=None, segredo=None):
+    """Lista de (nome do arquivo, PNG) com um QR Code por participante do pedido,
+    pronta para anexar no e-mail do comprador."""
+    criancas = list(criancas or [False] * len(nomes))
+    codigos = [assinar_ingresso(evento, pedido_id, i, criancas[i], segredo) for i in range(len(nomes))]
+    pngs = renderizar_qrcodes(codigos)
+    return [(_nome_arquivo(evento, pedido_id, i, nomes[i]), png) for i, png in enumerate(pngs)]
+
+
+# --- PEDIDOS E PAGAMENTO ---
+
+def _item(valores, seq):
+    """Item `seq` de uma lista separada por vírgulas; sem ele, reaproveita o último
+    (mesma regra da expansão do painel)."""
+    partes = (valores or '').split(',')
+    return partes[min(seq, len(partes) - 1)].strip()
+
+
+def _colunas_pedido(evento):
+    config = EVENTOS[evento]
+    return ['id', config['email'], config['qtd'], config['nomes'], COLUNA_PAGAMENTO] + (['e_crianca'] if evento == 'C' else [])
+
+
+def _ingressos_do_pedido(evento, pedido):
+    """[(pedido_id, assento, criança, nome)] de um pedido (linha da tabela de origem)."""
+    config = EVENTOS[evento]
+    ingressos = []
+    for seq in range(int(pedido.get(config['qtd']) or 0)):
+        crianca = evento == 'C' and _item(pedido.get('e_crianca'), seq).lower() == 'sim'
+        ingressos.append((int(pedido['id']), seq, crianca, _item(pedido.get(config['nomes']), seq)))
+    return ingressos
+
+
+def buscar_pedidos(cliente, evento, pagamento=None):
+    """Pedidos do evento (DataFrame), opcionalmente só os de uma situação de pagamento."""
+    config = EVENTOS[evento]
+    filtros = filtro_edicao(config['edicao'])
+    if pagamento is not None:
+        filtros = filtros + [('eq', COLUNA_PAGAMENTO, pagamento)]
+    return buscar_tabela_paginada(cliente, config['tabela'], ', '.join(_colunas_pedido(evento)), filtros=filtros)
+
+
+def situacao_pagamentos(cliente, evento):
+    """{id do pedido: situação do pagamento} de todos os pedidos do evento."""
+    config = EVENTOS[evento]
+    pedidos = buscar_tabela_paginada(cliente, config['tabela'], f"id, {COLUNA_PAGAMENTO}", filtros=filtro_edicao(config['edicao']))
+    return {int(p['id']): p[COLUNA_PAGAMENTO] for p in pedidos.to_dict('records')}
+
+
+def _marcar_pagamento(cliente, evento, ids, situacao, de=None):
+    """Atualiza a situação dos pedidos `ids` (só os que estão em `de`, se dado) e retorna as linhas alteradas."""
+    config = EVENTOS[evento]
+    consulta = (cliente.table(config['tabela']).update({COLUNA_PAGAMENTO: situacao})
+                .eq(COLUNA_EDICAO, config['edicao']).in_('id', [int(i) for i in ids]))
+    if de is not None:
+        consulta = consulta.eq(COLUNA_PAGAMENTO, de)
+    return consulta.execute().data or []
+
+
+def confirmar_pedidos(cliente, evento, ids, remetente, segredo=None):
+    """Confirma o pagamento de pedidos pendentes e enfileira para cada comprador o
+    e-mail com os QR Codes dos ingressos. Retorna quantos pedidos foram confirmados."""
+    _segredo(segredo)  # sem segredo não confirma nada: o pedido ficaria pago e sem ingressos
+    config = EVENTOS[evento]
+    # Marca primeiro (só os ainda pendentes): dois organizadores confirmando ao
+    # mesmo tempo não mandam os ingressos duas vezes
+    pedidos = _marcar_pagamento(cliente, evento, ids, PAGAMENTO_CONFIRMADO, de=PAGAMENTO_PENDENTE)
+    for posicao, pedido in enumerate(pedidos):
+        try:
+            ingressos = _ingressos_do_pedido(evento, pedido)
+            if not ingressos:
+                continue
+            anexos = anexos_ingressos(
+                evento, pedido['id'], [nome for *_, nome in ingressos], [crianca for _, _, crianca, _ in ingressos], segredo
+            )
+            corpo = (
+                f"Olá!\n\nO pagamento do seu pedido nº {pedido['id']} ({config['nome']}) foi confirmado.\n\n"
+                "Os QR Codes dos ingressos (um por participante) estão em anexo: "
+                "apresente-os na entrada junto com o documento.\n\n"
+                "Obrigado por fazer parte da nossa história!\nOrganização Chapiuski"
+            )
+            caixa_saida.enviar_email(
+                remetente, [pedido[config['email']].strip()], f"🎟️ Seus ingressos - {config['nome']}",
+                texto=corpo, anexos=anexos
+            )
+        except Exception:
+            # Os que não foram para a caixa de saída voltam a pendentes (confirmados sem ingresso ficariam presos)
+            _marcar_pagamento(cliente, evento, [p['id'] for p in pedidos[posicao:]], PAGAMENTO_PENDENTE, de=PAGAMENTO_CONFIRMADO)
+            raise
+    return len(pedidos)
+
+
+def cancelar_pedidos(cliente, evento, ids):
+    """Cancela pedidos (pendentes ou já confirmados). Os QR Codes já enviados passam
+    a ser recusados na porta assim que a situação dos pagamentos for atualizada lá.
+    Retorna quantos pedidos foram cancelados."""
+    return len(_marcar_pagamento(cliente, evento, ids, PAGAMENTO_CANCELADO))
+
+
+# --- REEMISSÃO EM LOTE ---
+
+def reemitir_evento(cliente, evento, segredo=None):
+    """Gera de novo os QR Codes dos pedidos confirmados do evento. Retorna (ZIP em bytes, nº de ingressos)."""
+    pedidos = buscar_pedidos(cliente, evento, pagamento=PAGAMENTO_CONFIRMADO)
+
+    ingressos = []
+    for pedido in pedidos.to_dict('records'):
+        ingressos.extend(_ingressos_do_pedido(evento, pedido))
+
+    codigos = [assinar_ingresso(evento, pedido_id, seq, crianca, segredo) for pedido_id, seq, crianca, _ in ingressos]
+    pngs = renderizar_qrcodes(codigos)
+
+    buffer = io.BytesIO()
+    # PNG já é comprimido: ZIP_STORED evita gastar CPU à toa
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as arquivo_zip:
+        for (pedido_id, seq, _, nome), png in zip(ingressos, pngs):
+            arquivo_zip.writestr(_nome_arquivo(evento, pedido_id, seq, nome), png)
+    return buffer.getvalue(), len(ingressos)
@@ -0,0 +1,59 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# O PostgREST corta silenciosamente as respostas no limite de linhas (max-rows,
+# 1000 por padrão no Supabase). Por isso toda leitura é feita em páginas.
+TAMANHO_PAGINA = 1000
+MAX_WORKERS = 4
+
+
+def _consulta_pagina(cliente, tabela, colunas, filtros, chave, inicio, fim, count=None):
+    """Monta e executa a consulta de uma única página (intervalo [inicio, fim])."""
+    consulta = cliente.table(tabela).select(colunas, count=count)
+    for metodo, coluna, valor in filtros or []:
+        consulta = getattr(consulta, metodo)(coluna, valor)
+    return consulta.order(chave).range(inicio, fim).execute()
+
+
+def buscar_tabela_paginada(cliente, tabela, colunas='*', filtros=None, ordenar_por=None, desc=False,
+                           chave='id', tamanho_pagina=TAMANHO_PAGINA, max_workers=MAX_WORKERS):
+    """Lê uma tabela inteira do Supabase em páginas `range()` buscadas em paralelo.
+
+    A primeira página já traz a contagem exata de linhas; as demais são buscadas
+    num pool de threads limitado. A paginação é sempre pela `chave` (id crescente),
+    assim pedidos inseridos durante a leitura entram no fim e não deslocam as páginas.
+    A ordenação pedida (`ordenar_por`/`desc`) é aplicada no DataFrame final.
+
+    `filtros` é uma lista de tuplas (metodo, coluna, valor), ex.: [('gte', 'id', 54)].
+    """
+    primeira = _consulta_pagina(cliente, tabela, colunas, filtros, chave, 0, tamanho_pagina - 1, count='exact')
+    paginas = [primeira.data or []]
+
+    total = primeira.count if primeira.count is not None else len(paginas[0])
+    num_paginas = math.ceil(total / tamanho_pagina) if total else 1
+
+    if num_paginas > 1:
+        inicios = [i * tamanho_pagina for i in range(1, num_paginas)]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(inicios))) as pool:
+            respostas = pool.map(
+                lambda inicio: _consulta_pagina(cliente, tabela, colunas, filtros, chave, inicio, inicio + tamanho_pagina - 1),
+                inicios
+            )
+            paginas.extend(resposta.data or [] for resposta in respostas)
+
+    # Linhas inseridas depois da contagem: continua lendo enquanto a última página vier cheia
+    while len(paginas[-1]) == tamanho_pagina:
+        inicio = len(paginas) * tamanho_pagina
+        paginas.append(_consulta_pagina(cliente, tabela, colunas, filtros, chave, inicio, inicio + tamanho_pagina - 1).data or [])
+
+    df = pd.DataFrame([linha for pagina in paginas for linha in pagina])
+    if df.empty:
+        return df
+
+    if chave in df.columns:
+        df = df.drop_duplicates(subset=chave, keep='last')
+    if ordenar_por and ordenar_por in df.columns:
+        df = df.sort_values(ordenar_por, ascending=not desc, kind='stable')
+    return df.reset_index(drop=True)
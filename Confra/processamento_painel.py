@@ -0,0 +1,864 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+# Para Machine Learning
+import joblib
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from edicoes import EDICAO_ATUAL, filtro_edicao
+from leitura_supabase import buscar_tabela_paginada
+
+# Busca, processamento e análises do painel de vendas, separados da interface
+# (acompanhamento_camisas.py) para que o worker do snapshot (worker_painel.py)
+# rode exatamente o mesmo pipeline fora do Streamlit. Os st.cache_* continuam
+# valendo: sem o servidor do Streamlit eles viram um cache em memória do processo.
+
+load_dotenv()
+
+@st.cache_resource
+def conectar_supabase() -> Client | None:
+    """Cliente do Supabase compartilhado pelo processo, ou None sem SUPABASE_URL/SUPABASE_KEY."""
+    url = os.getenv("SUPABASE_URL")
+    chave = os.getenv("SUPABASE_KEY")
+    if not (url and chave):
+        return None
+    return create_client(url, chave)
+
+
+# =========================================================================
+# === FUNÇÕES DE BUSCA E UTILITY ==========================================
+# =========================================================================
+
+# --- PROJEÇÃO DE COLUNAS POR CONSUMIDOR ---
+# Cada seção declara as colunas que lê; a busca baixa só a união delas, deixando
+# de fora textos longos que nenhuma seção usa (ex.: link_pagamento, tipo_compra).
+COLUNAS_POR_CONSUMIDOR = {
+    'compra_confra': {
+        'kpis_confra': ['qtd_confra', 'qtd_copo', 'valor_pix', 'e_crianca', 'created_at'],
+        'compradores': ['id', 'email_comprador', 'nome_comprador', 'created_at', 'valor_pix', 'qtd_confra', 'qtd_copo'],
+        'listas_confra': ['id', 'nome_comprador', 'nomes_participantes', 'documentos_participantes', 'e_crianca', 'nomes_copo', 'qtd_confra', 'qtd_copo'],
+    },
+    'compra_camisas': {
+        'camisas': ['quantidade', 'tamanho', 'tipo_camisa', 'numero_camisa', 'detalhes_pedido'],
+        'compradores': ['id', 'email_comprador', 'nome_comprador', 'created_at'],
+    },
+    'compra_ingressos': {
+        'festa': ['id', 'datahora', 'quantidade', 'lote', 'nomes', 'documentos'],
+        'compradores': ['email', 'datahora', 'nomes'],
+    },
+}
+
+def colunas_necessarias(tabela, consumidores=None):
+    """União das colunas declaradas pelos consumidores de uma tabela (todos, se None).
+    Sempre inclui `id`, usado como marca d'água e para a expansão por pedido."""
+    declaradas = COLUNAS_POR_CONSUMIDOR[tabela]
+    consumidores = consumidores or declaradas.keys()
+    colunas = ['id'] + [col for consumidor in consumidores for col in declaradas[consumidor]]
+    return tuple(dict.fromkeys(colunas))
+
+
+# --- MODO INCREMENTAL (DELTA SYNC) ---
+# Após a primeira carga completa, cada atualização busca apenas as linhas com
+# marca d'água (id, ou a coluna de data na falta dele) maior que a última vista.
+# Uma carga completa é refeita periodicamente para refletir edições/exclusões.
+INTERVALO_CARGA_COMPLETA = timedelta(minutes=30)
+
+@st.cache_resource
+def estado_sincronizacao():
+    """Estado compartilhado entre sessões: por (tabela, colunas), o DataFrame já baixado e sua marca d'água.
+    Cada chave tem seu próprio lock, para que as cargas paralelas não se bloqueiem."""
+    return {'locks': {}, 'tabelas': {}}
+
+
+def sincronizar_tabela(tabela, colunas=None):
+    """Busca dados de uma tabela específica no Supabase, ajustando a ordenação.
+    `colunas` (tupla) restringe o select; None busca todas as colunas.
+    Só a primeira chamada (e a ressincronização periódica) baixa a tabela inteira;
+    as demais trazem apenas os pedidos novos e os anexam ao cache.
+    Só a edição atual da tabela (edicoes.EDICAO_ATUAL) é lida, filtrada no banco.
+    Erros de acesso são propagados (o worker precisa saber que a busca falhou)."""
+    
+    if tabela == 'compra_ingressos':
+        coluna_ordenacao = 'datahora'
+    else:
+        coluna_ordenacao = 'created_at'
+
+    if colunas:
+        # A coluna de ordenação é necessária para ordenar o resultado e como marca d'água reserva
+        selecao = ', '.join(dict.fromkeys((*colunas, coluna_ordenacao)))
+    else:
+        selecao = '*'
+    filtros = filtro_edicao(EDICAO_ATUAL[tabela])
+    chave_cache = (tabela, selecao, EDICAO_ATUAL[tabela])
+
+    supabase = conectar_supabase()
+    if not supabase:
+        return pd.DataFrame()
+
+    estado = estado_sincronizacao()
+    with estado['locks'].setdefault(chave_cache, threading.Lock()):
+        cache = estado['tabelas'].get(chave_cache)
+        agora = datetime.now()
+
+        if cache is None or agora - cache['carga_completa'] > INTERVALO_CARGA_COMPLETA:
+            df = buscar_tabela_paginada(supabase, tabela, selecao, filtros=filtros, ordenar_por=coluna_ordenacao, desc=True)
+            carga_completa = agora
+        else:
+            df_novos = buscar_tabela_paginada(
+                supabase, tabela, selecao,
+                filtros=filtros + [('gt', cache['coluna_marca'], cache['marca'])],
+                ordenar_por=coluna_ordenacao, desc=True
+            )
+            df = cache['df']
+            if not df_novos.empty:
+                # Os novos pedidos são os mais recentes: ficam no topo, como na ordenação desc
+                df = pd.concat([df_novos, df], ignore_index=True)
+                if 'id' in df.columns:
+                    df = df.drop_duplicates(subset='id', keep='first').reset_index(drop=True)
+            carga_completa = cache['carga_completa']
+
+        coluna_marca = 'id' if 'id' in df.columns else coluna_ordenacao
+        if df.empty or coluna_marca not in df.columns:
+            # Sem marca d'água não há como buscar só o delta: força carga completa na próxima vez
+            estado['tabelas'].pop(chave_cache, None)
+        else:
+            estado['tabelas'][chave_cache] = {
+                'df': df,
+                'coluna_marca': coluna_marca,
+                'marca': df[coluna_marca].max(),
+                'carga_completa': carga_completa,
+            }
+    return df.copy()
+
+
+@st.cache_data(ttl=60) 
+def buscar_dados_supabase(tabela, colunas=None):
+    """sincronizar_tabela com cache de 60s para o painel: um erro vira aviso na tela e DataFrame vazio."""
+    try:
+        return sincronizar_tabela(tabela, colunas)
+    except Exception as e:
+        st.error(f"❌ Erro ao acessar a tabela '{tabela}': {e}")
+        return pd.DataFrame()
+
+
+def split_values(valores, seq):
+    """Versão vetorizada do antigo split_value: para cada linha, pega o item `seq` da
+    string separada por vírgulas. Se o índice não existir, reaproveita o último item."""
+    partes = valores.fillna('').astype(str).str.split(',')
+    tamanhos = partes.str.len().to_numpy()
+    itens = partes.explode().to_numpy()
+    # Posição de cada item no vetor "achatado": início da lista da linha + índice limitado ao último
+    inicio = np.cumsum(tamanhos) - tamanhos
+    posicao = inicio + np.minimum(np.asarray(seq), tamanhos - 1)
+    return pd.Series(itens[posicao], index=valores.index, dtype='object').str.strip()
+
+def repetir_por_quantidade(df, coluna_qtd, coluna_seq):
+    """Repete cada pedido `coluna_qtd` vezes (1 linha por item) e numera os itens de cada pedido em `coluna_seq`."""
+    qtd = df[coluna_qtd].to_numpy()
+    df_expandido = df.loc[df.index.repeat(qtd)].reset_index(drop=True)
+    df_expandido[coluna_seq] = np.arange(len(df_expandido)) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+    return df_expandido
+
+
+# --- NORMALIZAÇÃO DE NOMES E E-MAILS (COM CACHE) ---
+# Os mesmos compradores e participantes se repetem entre pedidos e eventos: cada
+# valor bruto é normalizado uma única vez e reaproveitado por todos os processar_*.
+LIMITE_CACHE_NORMALIZACAO = 200_000
+
+@st.cache_resource
+def cache_normalizacao():
+    """Cache compartilhado (valor bruto -> valor padronizado), um dicionário por tipo.
+    O lock protege o cache, usado ao mesmo tempo pelas cargas paralelas das tabelas."""
+    return {'lock': threading.Lock(), 'nome': {}, 'email': {}}
+
+def normalizar_com_cache(serie, tipo, normalizar):
+    """Aplica `normalizar` (operações .str sobre uma Series) só aos valores únicos ainda
+    não vistos e mapeia o resultado de volta para a coluna inteira. Nulos continuam nulos."""
+    caches = cache_normalizacao()
+    cache = caches[tipo]
+    codigos, unicos = pd.factorize(serie)
+    with caches['lock']:
+        novos = [valor for valor in unicos if valor not in cache]
+        if novos:
+            if len(cache) + len(novos) > LIMITE_CACHE_NORMALIZACAO:
+                # Recomeça o cache, mas com todos os valores deste lote (inclusive os já vistos)
+                cache.clear()
+                novos = list(unicos)
+            cache.update(zip(novos, normalizar(pd.Series(novos, dtype='object')).tolist()))
+        # O código -1 (nulo) cai na última posição, reservada para NaN
+        padronizados = np.array([cache[valor] for valor in unicos] + [np.nan], dtype='object')
+    return pd.Series(padronizados[codigos], index=serie.index, dtype='object')
+
+def standardize_email(email_series):
+    """Padroniza e-mails para garantir unicidade (lower case e sem espaços)."""
+    return normalizar_com_cache(email_series, 'email', lambda s: s.astype(str).str.lower().str.strip())
+
+def standardize_name(name_series):
+    """Padroniza nomes removendo espaços múltiplos e espaços em branco desnecessários."""
+    if name_series is None or name_series.empty:
+        return pd.Series([], dtype='object')
+    # Remove espaços múltiplos, converte para strip, e capitaliza o início de cada palavra
+    return normalizar_com_cache(
+        name_series, 'nome',
+        lambda s: s.astype(str).str.strip().str.replace(r'\s+', ' ', regex=True).str.title()
+    )
+
+# --- OTIMIZAÇÃO DE TIPOS (ETAPA FINAL DE CADA processar_*) ---
+def otimizar_tipos(df, categoricas=(), inteiros=(), textos=()):
+    """Converte colunas de baixa cardinalidade em categóricas, quantidades em inteiros
+    pequenos e textos em strings com backend pyarrow. Colunas ausentes são ignoradas."""
+    if df is None or df.empty:
+        return df
+    for col in categoricas:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in inteiros:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in textos:
+        if col in df.columns:
+            df[col] = df[col].astype('string[pyarrow]')
+    return df
+
+# =========================================================================
+# === FUNÇÕES DE PROCESSAMENTO: CONFRA (Ajustado) =========================
+# =========================================================================
+
+def processar_dados_confra(df_confra):
+    """Calcula KPIs e trata a base para a Confra."""
+    if df_confra.empty:
+        return 0, 0, 0, 0, pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    df = df_confra.copy()
+    
+    # 🎯 PADRONIZAÇÃO DE E-MAIL e NOME
+    if 'email_comprador' in df.columns:
+        df['email_comprador_padrao'] = standardize_email(df['email_comprador'])
+        df['nome_comprador'] = standardize_name(df['nome_comprador'])
+    
+    # Cálculos de KPI
+    df['qtd_confra'] = pd.to_numeric(df['qtd_confra'], errors='coerce').fillna(0).astype(int)
+    df['qtd_copo'] = pd.to_numeric(df['qtd_copo'], errors='coerce').fillna(0).astype(int)
+    total_ingressos_bruto = df['qtd_confra'].sum()
+    total_copos = df['qtd_copo'].sum()
+    total_arrecadado_pix = df['valor_pix'].sum()
+    
+    if 'e_crianca' in df.columns:
+        df['qtd_criancas'] = df['e_crianca'].fillna('').astype(str).str.lower().str.count('sim')
+    else:
+        df['qtd_criancas'] = 0
+    total_criancas_gratis = df['qtd_criancas'].sum()
+    total_ingressos_pagantes = total_ingressos_bruto - total_criancas_gratis
+    
+    # 🎯 TRATAMENTO DE DATA - CORREÇÃO DE TIMEZONE
+    df['data_pedido'] = pd.to_datetime(df['created_at'], errors='coerce') 
+    if df['data_pedido'].dt.tz is not None:
+        df['data_pedido'] = df['data_pedido'].dt.tz_convert('UTC').dt.tz_localize(None)
+    df['data_pedido'] = df['data_pedido'].dt.tz_localize('UTC').dt.tz_convert('America/Sao_Paulo')
+    
+    # Expansão para Ingressos e Copos
+    df_ingressos_expanded, df_copos_expanded = expandir_dados_confra(df)
+    
+    # Otimização de tipos (após os KPIs, que somam em int64)
+    otimizar_tipos(df, inteiros=['qtd_confra', 'qtd_copo', 'qtd_criancas'], textos=['nome_comprador', 'email_comprador_padrao'])
+    otimizar_tipos(
+        df_ingressos_expanded,
+        categoricas=['e_crianca_flag'],
+        inteiros=['qtd_confra', 'seq_ingresso'],
+        textos=['nome_comprador', 'email_comprador_padrao', 'nome_participante', 'documento_participante']
+    )
+    otimizar_tipos(
+        df_copos_expanded,
+        inteiros=['qtd_copo', 'seq_copo'],
+        textos=['nome_comprador', 'email_comprador_padrao', 'nome_no_copo']
+    )
+    
+    return total_ingressos_pagantes, total_criancas_gratis, total_copos, total_arrecadado_pix, df, df_ingressos_expanded, df_copos_expanded
+
+
+def expandir_dados_confra(df):
+    """Expande a tabela Confra em duas: uma para Ingressos e outra para Copos."""
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    df = df.copy()
+    
+    # --- 1. EXPANSÃO DE INGRESSOS (LISTA DE PARTICIPANTES) ---
+    colunas_base_ingresso = [
+        'data_pedido', 'nome_comprador', 'email_comprador_padrao', 'nomes_participantes', 
+        'documentos_participantes', 'e_crianca', 'qtd_confra', 'id'
+    ]
+    cols_existentes_ingresso = [col for col in colunas_base_ingresso if col in df.columns]
+    df_base_ingresso = df[cols_existentes_ingresso].loc[df['qtd_confra'] > 0].copy()
+    
+    if df_base_ingresso.empty:
+          df_ingressos = pd.DataFrame()
+    else:
+        df_ingressos = repetir_por_quantidade(df_base_ingresso, 'qtd_confra', 'seq_ingresso')
+        seq = df_ingressos['seq_ingresso']
+        
+        # Nome do participante também padronizado
+        df_ingressos['nome_participante'] = standardize_name(split_values(df_ingressos['nomes_participantes'], seq))
+        df_ingressos['documento_participante'] = split_values(df_ingressos['documentos_participantes'], seq)
+        df_ingressos['e_crianca_flag'] = split_values(df_ingressos['e_crianca'], seq)
+    
+    # --- 2. EXPANSÃO DE COPOS (LISTA DE PERSONALIZAÇÃO) ---
+    colunas_base_copo = [
+        'data_pedido', 'nome_comprador', 'email_comprador_padrao', 'nomes_copo', 'qtd_copo', 'id'
+    ]
+    cols_existentes_copo = [col for col in colunas_base_copo if col in df.columns]
+    df_base_copo = df[cols_existentes_copo].loc[df['qtd_copo'] > 0].copy()
+
+    if df_base_copo.empty:
+        df_copos = pd.DataFrame()
+    else:
+        df_copos = repetir_por_quantidade(df_base_copo, 'qtd_copo', 'seq_copo')
+        df_copos['nome_no_copo'] = standardize_name(split_values(df_copos['nomes_copo'], df_copos['seq_copo']))
+    
+    return df_ingressos, df_copos
+
+
+# =========================================================================
+# === FUNÇÕES DE PROCESSAMENTO: CAMISAS (Ajustado) =========================
+# =========================================================================
+
+def processar_dados_camisas(df_camisas):
+    """Calcula KPIs e expande o DataFrame para análise por item (Camisas)."""
+    if df_camisas.empty:
+        return None
+        
+    df = df_camisas.copy()
+    
+    # 🎯 PADRONIZAÇÃO DE E-MAIL e NOME
+    if 'email_comprador' in df.columns:
+        df['email_comprador_padrao'] = standardize_email(df['email_comprador'])
+        df['nome_comprador'] = standardize_name(df['nome_comprador'])
+    
+    # 🎯 TRATAMENTO DE DATA - CORREÇÃO DE TIMEZONE
+    df['data_pedido'] = pd.to_datetime(df['created_at'], errors='coerce')
+    if df['data_pedido'].dt.tz is not None:
+        df['data_pedido'] = df['data_pedido'].dt.tz_convert('UTC').dt.tz_localize(None)
+    df['data_pedido'] = df['data_pedido'].dt.tz_localize('UTC').dt.tz_convert('America/Sao_Paulo')
+
+    # Expansão para 1 linha por camisa
+    df['quantidade'] = pd.to_numeric(df['quantidade'], errors='coerce').fillna(0).astype(int) 
+    df_expanded = repetir_por_quantidade(df, 'quantidade', 'seq_pedido')
+    seq = df_expanded['seq_pedido']
+
+    # Aplica split para obter detalhes por camisa (Nome na camisa também padronizado)
+    detalhes = split_values(df_expanded['detalhes_pedido'], seq)
+    df_expanded['nome_na_camisa'] = standardize_name(detalhes.str.split('(').str[0].str.strip())
+    df_expanded['tamanho_individual'] = split_values(df_expanded['tamanho'], seq)
+    df_expanded['tipo_individual'] = split_values(df_expanded['tipo_camisa'], seq)
+    df_expanded['numero_individual'] = split_values(df_expanded['numero_camisa'], seq)
+
+    # Mapeia o preço
+    precos = {'Jogador': 150, 'Torcedor': 115}
+    df_expanded['preco_individual'] = df_expanded['tipo_individual'].map(precos).fillna(0)
+
+    # Otimização de tipos
+    otimizar_tipos(
+        df_expanded,
+        categoricas=['tamanho_individual', 'tipo_individual'],
+        inteiros=['quantidade', 'seq_pedido'],
+        textos=['nome_comprador', 'email_comprador_padrao', 'nome_na_camisa']
+    )
+    
+    return df_expanded
+
+
+# =========================================================================
+# === FUNÇÕES DE PROCESSAMENTO: FESTA 2026 (Ajustado) =====================
+# =========================================================================
+
+def processar_dados_festa(df_festa):
+    """Calcula KPIs e expande o DataFrame para a Festa 2026. RETORNA O DF BRUTO/PADRONIZADO E O EXPANDIDO"""
+    if df_festa.empty:
+        return None
+    
+    df = df_festa.copy()
+    
+    # 🎯 PADRONIZAÇÃO DE E-MAIL
+    if 'email' in df.columns:
+        df['email_comprador_padrao'] = standardize_email(df['email'])
+    
+    # 🎯 TRATAMENTO DE DATA - CORREÇÃO DE TIMEZONE
+    df['datahora'] = pd.to_datetime(df['datahora'], errors='coerce')
+    if df['datahora'].dt.tz is not None:
+        df['datahora'] = df['datahora'].dt.tz_convert('UTC').dt.tz_localize(None)
+        
+    df['datahora'] = df['datahora'].dt.tz_localize('UTC').dt.tz_convert('America/Sao_Paulo')
+    
+    # Expansão para 1 linha por ingresso
+    df['quantidade'] = pd.to_numeric(df['quantidade'], errors='coerce').fillna(0).astype(int) 
+    df_expanded = repetir_por_quantidade(df, 'quantidade', 'seq')
+    df_expanded['quantidade'] = 1 
+
+    # Expansão dos participantes (Nome do participante também padronizado)
+    df_expanded['nome_participante'] = standardize_name(split_values(df_expanded['nomes'], df_expanded['seq']))
+    df_expanded['documento_participante'] = split_values(df_expanded['documentos'], df_expanded['seq'])
+
+    # Mapeamento e cálculo de preço (lotes da Festa 2026, ver backup_ingressos_festa.py)
+    precos = {'LOTE GERAL': 130, 'LOTE PORTA': 155}
+    df_expanded['lote'] = df_expanded['lote'].str.upper().str.strip() 
+    df_expanded['preco_unitario'] = df_expanded['lote'].map(precos).fillna(0)
+    
+    # KPIs
+    total_vendido = df_expanded.shape[0]
+    total_disponivel = 100 
+    percentual_ocupacao = total_vendido / total_disponivel * 100 if total_disponivel else 0
+    total_arrecadado = df_expanded['preco_unitario'].sum()
+
+    venda_por_dia = df_expanded.groupby(df_expanded['datahora'].dt.date).size().reset_index(name='quantidade')
+    venda_por_dia['quantidade'] = venda_por_dia['quantidade'].astype(int)
+    velocidade_media = venda_por_dia['quantidade'].mean()
+    
+    # Otimização de tipos (após os KPIs)
+    otimizar_tipos(df, inteiros=['quantidade'], textos=['email_comprador_padrao'])
+    otimizar_tipos(
+        df_expanded,
+        categoricas=['lote'],
+        inteiros=['quantidade', 'seq'],
+        textos=['email_comprador_padrao', 'nome_participante', 'documento_participante']
+    )
+    
+    return total_vendido, total_arrecadado, percentual_ocupacao, velocidade_media, df, df_expanded
+
+
+# =========================================================================
+# === MAPAS DE CALOR: HISTOGRAMA DIA x HORA (COMPARTILHADO) ===============
+# =========================================================================
+
+DIAS_SEMANA_PT = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+def versao_dados(serie):
+    """Versão barata de uma coluna (tamanho + hash vetorizado do conteúdo), usada como chave de cache."""
+    return f"{len(serie)}-{pd.util.hash_pandas_object(serie, index=False).sum()}"
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def histograma_dia_hora(evento, versao, _datas):
+    """Matriz 7x24 de contagens (linhas = segunda..domingo, colunas = hora), calculada com
+    dayofweek*24 + hour e np.bincount. Cacheada por evento e versão dos dados."""
+    datas = _datas.dropna()
+    posicoes = datas.dt.dayofweek.to_numpy() * 24 + datas.dt.hour.to_numpy()
+    return np.bincount(posicoes, minlength=7 * 24).reshape(7, 24)
+
+
+# =========================================================================
+# === MACHINE LEARNING E ANÁLISES AVANÇADAS (AJUSTADO PARA TODOS) =========
+# =========================================================================
+
+AMOSTRA_SILHUETA = 2000 # Máximo de clientes usados para avaliar cada K
+
+def impressao_digital(X):
+    """Hash estável de uma matriz numérica (formato + conteúdo), usado como chave de cache."""
+    X = np.ascontiguousarray(X, dtype=float)
+    return hashlib.sha1(str(X.shape).encode() + X.tobytes()).hexdigest()
+
+def _silhueta_para_k(X_amostra, k):
+    """Ajusta um MiniBatchKMeans rápido e devolve o coeficiente de silhueta do agrupamento."""
+    rotulos = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=3, batch_size=1024).fit_predict(X_amostra)
+    if len(np.unique(rotulos)) < 2:
+        return -1.0
+    return silhouette_score(X_amostra, rotulos)
+
+def calculate_optimal_k(X_scaled, max_k=10):
+    """Escolhe o K com maior coeficiente de silhueta (interno).
+    Avalia uma amostra dos clientes, com MiniBatchKMeans e os K testados em paralelo."""
+    n_distintos = len(np.unique(X_scaled, axis=0))
+    if n_distintos < 3:
+        # A silhueta exige 2 <= K <= n-1: com tão poucos perfis, cada um é um cluster
+        return max(n_distintos, 1)
+
+    X_amostra = X_scaled
+    if X_scaled.shape[0] > AMOSTRA_SILHUETA:
+        indices = np.random.default_rng(42).choice(X_scaled.shape[0], AMOSTRA_SILHUETA, replace=False)
+        X_amostra = X_scaled[indices]
+
+    k_range = list(range(2, min(max_k, n_distintos - 1) + 1))
+    silhuetas = Parallel(n_jobs=-1, prefer='threads')(delayed(_silhueta_para_k)(X_amostra, k) for k in k_range)
+    return k_range[int(np.argmax(silhuetas))]
+
+# --- MODELO DE SEGMENTAÇÃO PERSISTIDO ---
+# Scaler, centróides e K ficam salvos em disco (versionados). Clientes novos ou
+# alterados são apenas atribuídos com predict; o modelo só é reajustado quando os
+# dados derivam além dos limites abaixo.
+VERSAO_MODELO_SEGMENTACAO = 1
+ARQUIVO_MODELO_SEGMENTACAO = os.path.join(
+    os.path.dirname(__file__), f"modelo_segmentacao_v{VERSAO_MODELO_SEGMENTACAO}.joblib"
+)
+LIMITE_DERIVA_MEDIA = 0.5       # Deslocamento máximo da média de uma feature (em desvios-padrão do ajuste)
+LIMITE_CRESCIMENTO_BASE = 0.25  # Crescimento máximo da base de clientes desde o ajuste (25%)
+
+def carregar_modelo_segmentacao(features):
+    """Lê o modelo salvo; devolve None se não existir, estiver corrompido ou for de outra versão/features."""
+    try:
+        modelo = joblib.load(ARQUIVO_MODELO_SEGMENTACAO)
+    except Exception:
+        return None
+    if modelo.get('versao') != VERSAO_MODELO_SEGMENTACAO or modelo.get('features') != list(features):
+        return None
+    return modelo
+
+def salvar_modelo_segmentacao(modelo):
+    """Grava o modelo de forma atômica (arquivo temporário + rename)."""
+    temporario = f"{ARQUIVO_MODELO_SEGMENTACAO}.{os.getpid()}.tmp"
+    joblib.dump(modelo, temporario)
+    os.replace(temporario, ARQUIVO_MODELO_SEGMENTACAO)
+
+def ajustar_modelo_segmentacao(X, features):
+    """Ajuste completo: StandardScaler, escolha de K e KMeans sobre toda a base."""
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    K = calculate_optimal_k(X_scaled)
+    kmeans = KMeans(n_clusters=K, random_state=42, n_init=10).fit(X_scaled)
+    return {
+        'versao': VERSAO_MODELO_SEGMENTACAO,
+        'features': list(features),
+        'scaler': scaler,
+        'kmeans': kmeans,
+        'K': K,
+        'n_clientes': len(X),
+        'ajustado_em': datetime.now().isoformat(),
+    }
+
+def houve_deriva(modelo, X):
+    """Indica se os dados se afastaram do ajuste salvo o bastante para exigir um novo ajuste."""
+    deslocamento = np.abs(modelo['scaler'].transform(X).mean(axis=0)).max()
+    crescimento = len(X) / max(modelo['n_clientes'], 1) - 1
+    return deslocamento > LIMITE_DERIVA_MEDIA or crescimento > LIMITE_CRESCIMENTO_BASE
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def segmentar_clientes(impressao, _X, features):
+    """Atribui cada cliente a um cluster usando o modelo persistido, reajustando-o só
+    quando não há modelo válido ou houve deriva. Cacheado pela impressão digital da
+    matriz de features: enquanto os dados não mudam, nada é recalculado."""
+    modelo = carregar_modelo_segmentacao(features)
+    if modelo is None or houve_deriva(modelo, _X):
+        modelo = ajustar_modelo_segmentacao(_X, features)
+        salvar_modelo_segmentacao(modelo)
+    rotulos = modelo['kmeans'].predict(modelo['scaler'].transform(_X))
+    return modelo, rotulos
+
+def interpret_clusters(df_cluster_analysis_indexed, K):
+    """Gera uma descrição textual dos clusters baseada nas médias das métricas. (Interno)"""
+    descriptions = {}
+    
+    if K == 3:
+        df_analysis = df_cluster_analysis_indexed.T
+        cluster_0_gasto = df_analysis.get('Cluster 0', pd.Series()).get('GASTO TOTAL (R$)', 0)
+        
+        if cluster_0_gasto > 0:
+             descriptions['Cluster 0'] = f"Clientes de **Alto Valor (VIPs)**: Têm o maior gasto e alto volume de compras. Gasto médio: R$ {cluster_0_gasto:.2f}."
+             descriptions['Cluster 1'] = f"Clientes **Frequentes/Moderados**: Alto volume de transações em eventos (Pedidos Confra/Festa). Gasto moderado."
+             descriptions['Cluster 2'] = f"Clientes **Ocasionais/Novos**: Menor gasto e baixa frequência. Clientes em fase de aquisição."
+        else:
+             descriptions['Cluster 0'] = "Grupo 0: Tendência a ser o maior valor (Gasto Total)."
+             descriptions['Cluster 1'] = "Grupo 1: Tendência a ser a maior frequência de pedidos."
+             descriptions['Cluster 2'] = "Grupo 2: Tendência a ser o menor gasto/frequência."
+    else:
+         for i in range(K):
+              descriptions[f'Cluster {i}'] = f"Cluster {i}: Analise as colunas do heatmap para identificar o perfil dominante (Gasto/Frequência)."
+            
+    return descriptions
+
+
+# Métricas por cliente geradas a partir da tabela de fatos (ordem das colunas do pivot)
+METRICAS_CLIENTE = [
+    'gasto_confra', 'gasto_camisa', 'gasto_festa',
+    'qtd_ing_confra', 'qtd_copo_confra', 'qtd_camisa', 'qtd_ing_festa',
+    'num_compras_confra', 'num_compras_camisas', 'num_compras_festa'
+]
+
+def montar_tabela_fatos(df_confra, df_camisas_expanded, df_festa, df_festa_expanded):
+    """Empilha todas as métricas de compra em formato longo: (email, evento, metrica, valor).
+    Cada pedido/item contribui com uma linha por métrica; a agregação fica para um único pivot."""
+    blocos = []
+
+    def adicionar(df, evento, metricas):
+        emails = df['email_comprador_padrao'].to_numpy()
+        for metrica, valores in metricas.items():
+            blocos.append(pd.DataFrame({'email': emails, 'evento': evento, 'metrica': metrica, 'valor': valores}))
+
+    adicionar(df_confra, 'Confra', {
+        'gasto_confra': df_confra['valor_pix'].to_numpy(dtype=float),
+        'qtd_ing_confra': df_confra['qtd_confra'].to_numpy(dtype=float),
+        'qtd_copo_confra': df_confra['qtd_copo'].to_numpy(dtype=float),
+        'num_compras_confra': 1.0,
+    })
+    adicionar(df_camisas_expanded, 'Camisas', {
+        'gasto_camisa': df_camisas_expanded['preco_individual'].to_numpy(dtype=float),
+        'qtd_camisa': 1.0,
+    })
+    pedidos_camisas = df_camisas_expanded.drop_duplicates(subset=['id'])
+    adicionar(pedidos_camisas, 'Camisas', {'num_compras_camisas': 1.0})
+    adicionar(df_festa_expanded, 'Festa 2026', {
+        'gasto_festa': df_festa_expanded['preco_unitario'].to_numpy(dtype=float),
+        'qtd_ing_festa': df_festa_expanded['quantidade'].to_numpy(dtype=float),
+    })
+    # Pedidos contados na tabela de pedidos (não expandida): pedidos sem ingresso também contam
+    adicionar(df_festa, 'Festa 2026', {'num_compras_festa': 1.0})
+
+    df_fatos = pd.concat(blocos, ignore_index=True)
+    df_fatos['evento'] = df_fatos['evento'].astype('category')
+    df_fatos['metrica'] = pd.Categorical(df_fatos['metrica'], categories=METRICAS_CLIENTE)
+    return df_fatos
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def calcular_analises_avancadas(versao, _df_confra, _df_camisas_expanded, _df_festa, _df_festa_expanded, total_arrecadado_festa):
+    """Consolida as três bases e calcula tudo o que a aba de análises exibe (arrecadação,
+    crescimento de compradores, lista de compradores com cluster e médias por cluster).
+    Cacheada pela versão combinada dos dados: só recalcula quando chega pedido novo."""
+    df_confra, df_camisas_expanded, df_festa = _df_confra, _df_camisas_expanded, _df_festa
+    df_festa_expanded = _df_festa_expanded.copy()
+
+    # -------------------------------------------------------------------------
+    # CONSOLIDAÇÃO DE EMAILS (PARA CRESCIMENTO E LISTA)
+    # -------------------------------------------------------------------------
+
+    # df_confra: data_pedido, nome_comprador (JÁ PADRONIZADOS no processamento)
+    df_confra_compradores = df_confra[['email_comprador_padrao', 'data_pedido', 'nome_comprador']].rename(columns={'data_pedido': 'datahora', 'nome_comprador': 'nome'}).copy()
+
+    # df_camisas_expanded: data_pedido, nome_comprador (JÁ PADRONIZADOS no processamento)
+    df_camisas_compradores = df_camisas_expanded[['email_comprador_padrao', 'data_pedido', 'nome_comprador']].rename(columns={'data_pedido': 'datahora', 'nome_comprador': 'nome'}).copy().drop_duplicates(subset=['email_comprador_padrao', 'datahora'])
+
+    # df_festa: datahora (nome vem do split do 'nomes', que é nome_participante)
+    df_festa_compradores = df_festa[['email_comprador_padrao', 'datahora', 'nomes']].copy()
+    df_festa_compradores['nome'] = standardize_name(split_values(df_festa_compradores['nomes'], 0))
+    df_festa_compradores = df_festa_compradores.drop(columns=['nomes'])
+
+    # Consolida TUDO
+    df_compradores_consolidado = pd.concat([df_confra_compradores, df_camisas_compradores, df_festa_compradores], ignore_index=True)
+    df_compradores_consolidado = df_compradores_consolidado.dropna(subset=['datahora', 'email_comprador_padrao'])
+    df_compradores_consolidado = df_compradores_consolidado.rename(columns={'email_comprador_padrao': 'email'})
+
+    # Garantir que o nome do comprador seja único por email (usando a última versão do nome)
+    df_nomes_unicos = df_compradores_consolidado.drop_duplicates(subset=['email'], keep='last')[['email', 'nome']]
+
+    # -------------------------------------------------------------------------
+    # 1. ARRECADAÇÃO TOTAL POR EVENTO
+    # -------------------------------------------------------------------------
+    df_arrecadacao = pd.DataFrame({
+        'Evento': ['Confra', 'Camisas', 'Festa 2026'],
+        'Arrecadação (R$)': [df_confra['valor_pix'].sum(), df_camisas_expanded['preco_individual'].sum(), total_arrecadado_festa]
+    })
+
+    # -------------------------------------------------------------------------
+    # 2. CRESCIMENTO DE COMPRADORES ATIVOS
+    # -------------------------------------------------------------------------
+    df_crescimento_email = df_compradores_consolidado[['email', 'datahora']].copy()
+
+    df_crescimento_email = df_crescimento_email.sort_values('datahora')
+    df_crescimento_email['data_dia'] = df_crescimento_email['datahora'].dt.date
+    df_crescimento_email['is_new'] = ~df_crescimento_email['email'].duplicated()
+    compras_por_dia = df_crescimento_email.groupby('data_dia')['is_new'].sum().rename('novos_participantes')
+
+    compras_cumulativas = compras_por_dia.cumsum().rename('participantes_acumulados').reset_index()
+    compras_cumulativas['data_dia'] = pd.to_datetime(compras_cumulativas['data_dia'])
+
+    # -------------------------------------------------------------------------
+    # 3. LISTA COMPLETA DE COMPRADORES (DETALHADA COM CLUSTER)
+    # -------------------------------------------------------------------------
+
+    # --- PREPARAR A BASE COMPLETA (DF_LISTA) ---
+    # Uma única tabela de fatos (email, evento, metrica, valor) e um único pivot
+    # produzem todas as métricas por cliente, sem a cadeia de merges por evento.
+    df_fatos = montar_tabela_fatos(df_confra, df_camisas_expanded, df_festa, df_festa_expanded)
+    df_lista = df_fatos.pivot_table(
+        index='email', columns='metrica', values='valor', aggfunc='sum', fill_value=0, observed=True
+    ).reindex(columns=METRICAS_CLIENTE, fill_value=0).reset_index()
+    df_lista.columns.name = None
+    metricas_contagem = [m for m in METRICAS_CLIENTE if not m.startswith('gasto_')]
+    df_lista[metricas_contagem] = df_lista[metricas_contagem].astype(int)
+
+    df_lista['gasto_total'] = df_lista['gasto_confra'] + df_lista['gasto_camisa'] + df_lista['gasto_festa']
+    df_lista['qtd_ingressos'] = df_lista['qtd_ing_confra'] + df_lista['qtd_ing_festa']
+    df_lista['qtd_copo_total'] = df_lista['qtd_copo_confra']
+    df_lista['qtd_camisas'] = df_lista['qtd_camisa']
+    df_lista['qtd_total_comprada'] = df_lista['qtd_ingressos'] + df_lista['qtd_copo_total'] + df_lista['qtd_camisas']
+
+    df_lista = pd.merge(df_lista, df_nomes_unicos, on='email', how='left')
+
+    # --- BASE PARA CLUSTERING (as contagens de pedidos já vêm do mesmo pivot) ---
+    df_clientes_for_cluster = df_lista
+
+    features = ['gasto_total', 'qtd_ingressos', 'qtd_copo_total', 'qtd_camisas', 'num_compras_confra', 'num_compras_camisas', 'num_compras_festa']
+    X_cluster = df_clientes_for_cluster[features].astype(float)
+    X_cluster = X_cluster[(X_cluster != 0).any(axis=1)].copy()
+    df_clientes_clustered = df_clientes_for_cluster.iloc[X_cluster.index].reset_index(drop=True)
+
+    X_valores = X_cluster.to_numpy()
+    modelo_segmentacao, rotulos = segmentar_clientes(impressao_digital(X_valores), X_valores, tuple(features))
+    K = modelo_segmentacao['K']
+    df_clientes_clustered['cluster'] = 'Cluster ' + rotulos.astype(str)
+
+    # Adicionar o cluster na lista completa (df_lista)
+    df_lista = pd.merge(df_lista, df_clientes_clustered[['email', 'cluster']], on='email', how='left').fillna({'cluster': 'Não Class.'})
+    df_lista['cluster'] = df_lista['cluster'].astype('category')
+
+    # Ordenação e Renomeação para exibição
+    df_lista = df_lista.sort_values(by='gasto_total', ascending=False).reset_index(drop=True)
+    df_lista['Ranking'] = df_lista.index + 1
+
+    df_display_compradores = df_lista[[
+        'cluster', 'Ranking', 'email', 'nome', 'gasto_total', 'qtd_total_comprada',
+        'qtd_ingressos', 'qtd_copo_total', 'qtd_camisas'
+    ]].rename(columns={
+        'cluster': 'Cluster',
+        'nome': 'Nome Completo',
+        'gasto_total': 'Gasto Total (R$)',
+        'qtd_total_comprada': 'Qtd. Total',
+        'qtd_ingressos': 'Qtd. Ingressos (Confra+Festa)',
+        'qtd_copo_total': 'Qtd. Copos',
+        'qtd_camisas': 'Qtd. Camisas'
+    })
+
+    # -------------------------------------------------------------------------
+    # 4. DATAS PARA O MAPA DE CALOR CONSOLIDADO
+    # -------------------------------------------------------------------------
+    datas_pedidos = pd.concat([
+        df_confra['data_pedido'],
+        df_camisas_expanded['data_pedido'].drop_duplicates(),
+        df_festa['datahora']
+    ], ignore_index=True).dropna()
+
+    # -------------------------------------------------------------------------
+    # 5. MÉDIA DAS CARACTERÍSTICAS POR CLUSTER
+    # -------------------------------------------------------------------------
+    df_heatmap = None
+    if 'cluster' in df_clientes_clustered.columns:
+        df_cluster_analysis = df_clientes_clustered.groupby('cluster')[features].mean().reset_index()
+
+        feature_mapping = {
+            'gasto_total': 'GASTO TOTAL (R$)', 'qtd_ingressos': 'Qtd. Total Ingressos',
+            'qtd_copo_total': 'Qtd. Total Copos', 'qtd_camisas': 'Qtd. Total Camisas',
+            'num_compras_confra': 'Pedidos Confra', 'num_compras_camisas': 'Pedidos Camisas',
+            'num_compras_festa': 'Pedidos Festa'
+        }
+
+        df_cluster_analysis.columns = ['cluster'] + [feature_mapping.get(col, col) for col in features]
+
+        # Indexar pelo cluster (mesmo formato usado por interpret_clusters)
+        df_heatmap = df_cluster_analysis.set_index('cluster').T
+
+    return {
+        'arrecadacao': df_arrecadacao,
+        'crescimento': compras_cumulativas,
+        'compradores': df_display_compradores,
+        'datas_pedidos': datas_pedidos,
+        'medias_cluster': df_heatmap,
+        'K': K,
+        'versao': versao,  # identifica as figuras derivadas no cache de figuras
+    }
+
+
+
+# =========================================================================
+# === RESULTADOS DERIVADOS POR SEÇÃO (CACHEADOS PELA VERSÃO DOS DADOS) ====
+# =========================================================================
+# Cada aba tem o seu próprio cache: abrir (ou reabrir) uma aba só recalcula as
+# agregações dela, e apenas quando a versão dos dados de origem mudou.
+
+PROCESSADORES = {
+    'compra_confra': processar_dados_confra,
+    'compra_camisas': processar_dados_camisas,
+    'compra_ingressos': processar_dados_festa,
+}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def processar_tabela(tabela, versao, _df):
+    """Processamento (padronização, expansão, KPIs) de uma tabela, cacheado pela versão dos dados brutos."""
+    return PROCESSADORES[tabela](_df)
+
+
+def carregar_e_processar(tabela):
+    """Busca uma tabela (só as colunas que o painel usa) e aplica o seu processamento.
+    O processamento é reaproveitado do cache enquanto os dados brutos não mudarem."""
+    df = buscar_dados_supabase(tabela, colunas_necessarias(tabela))
+    return processar_tabela(tabela, versao_dados(df), df)
+
+
+def carregar_tabelas(*tabelas):
+    """Busca e processa as tabelas pedidas em paralelo: a carga passa a custar o tempo
+    da tabela mais lenta, e não a soma. Retorna {tabela: resultado do processamento}."""
+    if len(tabelas) == 1:
+        return {tabelas[0]: carregar_e_processar(tabelas[0])}
+
+    # As threads herdam o contexto da sessão para que st.cache_data e st.error funcionem nelas
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(tabelas), initializer=add_script_run_ctx, initargs=(None, ctx)) as pool:
+        return dict(zip(tabelas, pool.map(carregar_e_processar, tabelas)))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def derivados_confra(versao, _df_confra):
+    """Séries dos gráficos da Confra: arrecadação acumulada por dia e nº de pedidos de kit."""
+    df_confra = _df_confra
+    vendas_dia_confra = df_confra.groupby(df_confra['data_pedido'].dt.date)['valor_pix'].sum().reset_index(name='arrecadado_dia')
+    vendas_dia_confra['acumulado'] = vendas_dia_confra['arrecadado_dia'].cumsum()
+    vendas_dia_confra['data_pedido'] = pd.to_datetime(vendas_dia_confra['data_pedido'])
+
+    total_kits_transactions = len(df_confra[(df_confra['qtd_confra'] > 0) & (df_confra['qtd_copo'] > 0)])
+    return vendas_dia_confra, total_kits_transactions
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def derivados_camisas(versao, _df_camisas_expanded):
+    """Agregações dos gráficos de Camisas: tipo, tamanho, número e vendas acumuladas."""
+    df_camisas_expanded = _df_camisas_expanded
+
+    df_tipo = df_camisas_expanded['tipo_individual'].value_counts().reset_index(name='count')
+    df_tamanho = df_camisas_expanded.groupby(['tamanho_individual', 'tipo_individual'], observed=True).size().reset_index(name='count')
+
+    df_numeros = df_camisas_expanded['numero_individual'].value_counts().reset_index(name='count')
+    df_numeros = df_numeros[df_numeros['numero_individual'] != '']
+    df_numeros['numero_individual'] = pd.to_numeric(df_numeros['numero_individual'], errors='coerce').fillna(0).astype(int)
+    df_numeros = df_numeros.sort_values('numero_individual')
+    df_numeros = df_numeros[df_numeros['numero_individual'] != 0]
+
+    vendas_por_dia = df_camisas_expanded.groupby(df_camisas_expanded['data_pedido'].dt.date).size().reset_index(name='quantidade')
+    vendas_por_dia['acumulada'] = vendas_por_dia['quantidade'].cumsum()
+    vendas_por_dia['data_pedido'] = pd.to_datetime(vendas_por_dia['data_pedido'])
+
+    return df_tipo, df_tamanho, df_numeros, vendas_por_dia
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def derivados_festa(versao, _df_festa_expanded):
+    """Venda acumulada de ingressos da Festa por dia."""
+    df_festa_expanded = _df_festa_expanded
+    venda_por_dia = df_festa_expanded.groupby(df_festa_expanded['datahora'].dt.date).size().reset_index(name='quantidade')
+    venda_por_dia['datahora'] = pd.to_datetime(venda_por_dia['datahora'])
+    venda_por_dia['acumulada'] = venda_por_dia['quantidade'].cumsum()
+    return venda_por_dia
+
+
+
+def analises_dos_dados(dados):
+    """Análises avançadas a partir dos dados processados ({tabela: resultado}),
+    ou None se faltar alguma das três bases."""
+    df_confra = dados['compra_confra'][4]
+    df_camisas_expanded = dados['compra_camisas']
+    resultados_festa_kpis = dados['compra_ingressos']
+    if df_confra.empty or df_camisas_expanded is None or df_camisas_expanded.empty or resultados_festa_kpis is None:
+        return None
+
+    df_festa, df_festa_expanded = resultados_festa_kpis[4], resultados_festa_kpis[5]
+    versao = '|'.join(versao_dados(df) for df in (df_confra, df_camisas_expanded, df_festa_expanded))
+    return calcular_analises_avancadas(
+        versao, df_confra, df_camisas_expanded, df_festa, df_festa_expanded, resultados_festa_kpis[1]
+    )
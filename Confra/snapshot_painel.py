@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Snapshot do painel de vendas, gerado pelo worker (worker_painel.py) e lido
+# pelo painel no lugar de buscar e processar tudo a cada visita. Cada versão é
+# uma pasta imutável:
+#   <versao>/estrutura.json  resultados com escalares inline e DataFrames/Series por arquivo
+#   <versao>/*.parquet       tabelas processadas, derivadas e das análises
+#   <versao>/figuras.json    {seção: {id do gráfico: figura Plotly em JSON}}
+# e ATUAL.json aponta para a versão publicada (e guarda a última verificação do
+# worker). A pasta é escrita com nome temporário e renomeada no fim, e ATUAL.json
+# só muda depois disso: o painel nunca encontra um snapshot pela metade.
+PASTA_SNAPSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots_painel")
+ARQUIVO_ATUAL = "ATUAL.json"
+VERSOES_MANTIDAS = 3
+
+
+# --- SERIALIZAÇÃO DOS RESULTADOS ---
+
+def _gravar(valor, pasta, nome):
+    """Descreve `valor` em JSON, gravando DataFrames e Series em Parquet ao lado."""
+    if valor is None:
+        return None
+    if isinstance(valor, pd.DataFrame):
+        arquivo = f"{nome}.parquet"
+        valor.to_parquet(os.path.join(pasta, arquivo))
+        return {'df': arquivo}
+    if isinstance(valor, pd.Series):
+        arquivo = f"{nome}.parquet"
+        valor.to_frame('valor').to_parquet(os.path.join(pasta, arquivo))
+        return {'serie': arquivo, 'nome': valor.name}
+    if isinstance(valor, (tuple, list)):
+        return {'tupla': [_gravar(item, pasta, f"{nome}_{i}") for i, item in enumerate(valor)]}
+    if isinstance(valor, dict):
+        return {'dict': {chave: _gravar(item, pasta, f"{nome}_{chave}") for chave, item in valor.items()}}
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    return {'valor': valor}
+
+
+def _ler(estrutura, pasta):
+    """Inverso de _gravar."""
+    if estrutura is None:
+        return None
+    if 'df' in estrutura:
+        return pd.read_parquet(os.path.join(pasta, estrutura['df']))
+    if 'serie' in estrutura:
+        return pd.read_parquet(os.path.join(pasta, estrutura['serie']))['valor'].rename(estrutura['nome'])
+    if 'tupla' in estrutura:
+        return tuple(_ler(item, pasta) for item in estrutura['tupla'])
+    if 'dict' in estrutura:
+        return {chave: _ler(item, pasta) for chave, item in estrutura['dict'].items()}
+    return estrutura['valor']
+
+
+def _escrever_json(caminho, conteudo):
+    """Grava JSON de forma atômica (arquivo temporário + os.replace)."""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+# --- ESCRITA (WORKER) ---
+
+def salvar_snapshot(origem, dados, analises, figuras, pasta=PASTA_SNAPSHOTS):
+    """Grava e publica uma nova versão. `origem` é a impressão digital dos dados
+    brutos que a geraram; `dados` é {tabela: resultado processado}, `analises` o
+    dicionário das análises avançadas (ou None) e `figuras` {seção: {id: go.Figure}}.
+    Retorna o nome da versão."""
+    agora = datetime.now()
+    versao = f"{agora:%Y%m%d-%H%M%S}-{origem[:8]}"
+    destino = os.path.join(pasta, versao)
+    temporaria = os.path.join(pasta, f".{versao}.tmp")
+
+    os.makedirs(pasta, exist_ok=True)
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+
+    _escrever_json(os.path.join(temporaria, 'estrutura.json'), {
+        'versao': versao,
+        'gerado_em': agora.isoformat(timespec='seconds'),
+        'origem': origem,
+        'dados': _gravar(dados, temporaria, 'dados'),
+        'analises': _gravar(analises, temporaria, 'analises'),
+    })
+    _escrever_json(os.path.join(temporaria, 'figuras.json'), {
+        secao: {id_grafico: json.loads(figura.to_json()) for id_grafico, figura in figuras_secao.items()}
+        for secao, figuras_secao in figuras.items()
+    })
+    os.replace(temporaria, destino)
+
+    _escrever_json(os.path.join(pasta, ARQUIVO_ATUAL), {
+        'versao': versao, 'origem': origem, 'verificado_em': agora.isoformat(timespec='seconds')
+    })
+    _remover_antigas(pasta, versao)
+    return versao
+
+
+def marcar_verificacao(pasta=PASTA_SNAPSHOTS):
+    """Registra que o worker conferiu os dados e a versão publicada continua atual."""
+    atual = versao_publicada(pasta)
+    if atual is not None:
+        atual['verificado_em'] = datetime.now().isoformat(timespec='seconds')
+        _escrever_json(os.path.join(pasta, ARQUIVO_ATUAL), atual)
+
+
+def _remover_antigas(pasta, versao_atual):
+    """Mantém só as VERSOES_MANTIDAS mais recentes (quem ainda lê uma antiga já a tem em memória)."""
+    versoes = sorted(nome for nome in os.listdir(pasta)
+                     if os.path.isdir(os.path.join(pasta, nome)) and not nome.startswith('.'))
+    for nome in versoes[:-VERSOES_MANTIDAS]:
+        if nome != versao_atual:
+            shutil.rmtree(os.path.join(pasta, nome), ignore_errors=True)
+
+
+# --- LEITURA (PAINEL) ---
+
+def versao_publicada(pasta=PASTA_SNAPSHOTS):
+    """Conteúdo de ATUAL.json ({'versao', 'origem', 'verificado_em'}), ou None se não houver snapshot."""
+    try:
+        with open(os.path.join(pasta, ARQUIVO_ATUAL), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def carregar_snapshot(versao, pasta=PASTA_SNAPSHOTS):
+    """Lê uma versão inteira: {'versao', 'gerado_em', 'dados', 'analises', 'figuras'}."""
+    pasta_versao = os.path.join(pasta, versao)
+    with open(os.path.join(pasta_versao, 'estrutura.json'), encoding='utf-8') as arquivo:
+        estrutura = json.load(arquivo)
+    with open(os.path.join(pasta_versao, 'figuras.json'), encoding='utf-8') as arquivo:
+        figuras = json.load(arquivo)
+
+    return {
+        'versao': versao,
+        'gerado_em': datetime.fromisoformat(estrutura['gerado_em']),
+        'dados': _ler(estrutura['dados'], pasta_versao),
+        'analises': _ler(estrutura['analises'], pasta_versao),
+        'figuras': figuras,
+    }
@@ -0,0 +1,13 @@
+-- Entradas registradas na porta (check-in), enviadas em lote pelo espelho
+-- offline (Confra/checkin_offline.py). Uma linha por ingresso que entrou.
+--   evento: 'Confra' ou 'Festa 2026'
+--   chave:  "<id do pedido>-<nº do ingresso no pedido>"
+--   horario: hora local do aparelho que registrou a entrada
+
+CREATE TABLE IF NOT EXISTS checkin_entradas (
+    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    evento TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    horario TIMESTAMP NOT NULL,
+    CONSTRAINT checkin_entradas_evento_chave_key UNIQUE (evento, chave)
+);
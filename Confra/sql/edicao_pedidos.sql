@@ -0,0 +1,27 @@
+-- Edição (evento) de cada pedido nas tabelas de pedidos. Os apps gravam a
+-- edição em todo insert e filtram as leituras por ela (Confra/edicoes.py);
+-- o índice (edicao, id) atende tanto o filtro quanto a paginação por id e o
+-- delta sync do painel (id > marca d'água).
+-- Os pedidos já existentes são classificados pelos cortes de id que os apps
+-- usavam antes (compra_confra: camisetas 2026 a partir do id 54;
+-- compra_ingressos: Festa 2026 a partir do id 283, Festa 8 Anos antes dele).
+
+ALTER TABLE compra_confra ADD COLUMN IF NOT EXISTS edicao TEXT;
+ALTER TABLE compra_ingressos ADD COLUMN IF NOT EXISTS edicao TEXT;
+ALTER TABLE compra_camisas ADD COLUMN IF NOT EXISTS edicao TEXT;
+
+UPDATE compra_confra
+   SET edicao = CASE WHEN id >= 54 THEN 'camisetas-2026' ELSE 'confra-2025' END
+ WHERE edicao IS NULL;
+
+UPDATE compra_ingressos
+   SET edicao = CASE WHEN id >= 283 THEN 'festa-2026' ELSE 'festa-8-anos' END
+ WHERE edicao IS NULL;
+
+UPDATE compra_camisas
+   SET edicao = 'camisas-2025'
+ WHERE edicao IS NULL;
+
+CREATE INDEX IF NOT EXISTS compra_confra_edicao_id_idx ON compra_confra (edicao, id);
+CREATE INDEX IF NOT EXISTS compra_ingressos_edicao_id_idx ON compra_ingressos (edicao, id);
+CREATE INDEX IF NOT EXISTS compra_camisas_edicao_id_idx ON compra_camisas (edicao, id);
@@ -0,0 +1,110 @@
+-- Estoque por edição e item, em contadores atualizados atomicamente pelas
+-- funções abaixo (chamadas via rpc por Confra/estoque.py). Ler o estoque é ler
+-- uma linha por item, em vez de somar todos os pedidos da edição.
+--   edicao:  mesma edição gravada nos pedidos (Confra/edicoes.py)
+--   item:    'confra' (ingressos, incluindo crianças) ou 'copo'
+--   vendido: unidades já reservadas por pedidos
+
+CREATE TABLE IF NOT EXISTS estoque (
+    edicao TEXT NOT NULL,
+    item TEXT NOT NULL,
+    vendido INTEGER NOT NULL DEFAULT 0 CHECK (vendido >= 0),
+    PRIMARY KEY (edicao, item)
+);
+
+-- Reserva as quantidades de um pedido ({item: qtd}) respeitando os limites
+-- ({item: limite}): ou reserva tudo, ou nada (retorna false se algum item não
+-- couber). Os itens são travados sempre na mesma ordem, para dois pedidos
+-- simultâneos não entrarem em deadlock.
+CREATE OR REPLACE FUNCTION reservar_estoque(p_edicao TEXT, p_itens JSONB, p_limites JSONB)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_item TEXT;
+    v_qtd INTEGER;
+BEGIN
+    FOR v_item, v_qtd IN
+        SELECT key, value::INTEGER FROM jsonb_each_text(p_itens) WHERE value::INTEGER > 0 ORDER BY key
+    LOOP
+        INSERT INTO estoque (edicao, item) VALUES (p_edicao, v_item) ON CONFLICT DO NOTHING;
+        UPDATE estoque
+           SET vendido = vendido + v_qtd
+         WHERE edicao = p_edicao AND item = v_item
+           AND vendido + v_qtd <= (p_limites ->> v_item)::INTEGER;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'estoque esgotado: %', v_item;
+        END IF;
+    END LOOP;
+    RETURN TRUE;
+EXCEPTION
+    -- O bloco é desfeito inteiro: nenhum item do pedido fica reservado
+    WHEN raise_exception THEN
+        RETURN FALSE;
+END;
+$$;
+
+-- Reserva o estoque e grava o pedido (JSON com as colunas de compra_confra,
+-- incluindo a edição) na mesma transação: se o insert falhar, a reserva é
+-- desfeita junto, e um cliente que cai no meio da chamada não deixa unidades
+-- presas. Retorna a linha gravada, ou NULL (nada gravado) se não couber.
+CREATE OR REPLACE FUNCTION inserir_pedido_confra(p_pedido JSONB, p_itens JSONB, p_limites JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_colunas TEXT;
+    v_pedido JSONB;
+BEGIN
+    IF NOT reservar_estoque(p_pedido ->> 'edicao', p_itens, p_limites) THEN
+        RETURN NULL;
+    END IF;
+    -- Só as colunas enviadas: as demais (id, pagamento...) ficam com o padrão da tabela
+    SELECT string_agg(quote_ident(coluna), ', ') INTO v_colunas FROM jsonb_object_keys(p_pedido) AS coluna;
+    EXECUTE format(
+        'WITH novo AS (
+             INSERT INTO compra_confra (%1$s)
+             SELECT %1$s FROM jsonb_populate_record(NULL::compra_confra, $1)
+             RETURNING *
+         )
+         SELECT to_jsonb(novo) FROM novo',
+        v_colunas
+    ) INTO v_pedido USING p_pedido;
+    RETURN v_pedido;
+END;
+$$;
+
+-- Devolve ao estoque as quantidades de um pedido cancelado ou apagado.
+CREATE OR REPLACE FUNCTION liberar_estoque(p_edicao TEXT, p_itens JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE estoque AS e
+       SET vendido = GREATEST(e.vendido - i.value::INTEGER, 0)
+      FROM jsonb_each_text(p_itens) AS i
+     WHERE e.edicao = p_edicao AND e.item = i.key;
+$$;
+
+-- Carga inicial e recontagem a partir dos pedidos já gravados da Confra 2025.
+-- Os contadores só mudam junto com os pedidos (inserir_pedido_confra), mas podem
+-- se afastar da tabela quando pedidos são apagados ou editados à mão no painel
+-- do Supabase, ou quando a reserva e o insert foram feitos em chamadas separadas
+-- (reservar_estoque direto). Para conferir a diferença:
+--   SELECT e.item, e.vendido, p.pedidos
+--     FROM estoque e
+--     JOIN (SELECT 'confra' AS item, COALESCE(SUM(qtd_confra), 0) AS pedidos FROM compra_confra WHERE edicao = 'confra-2025'
+--           UNION ALL
+--           SELECT 'copo', COALESCE(SUM(qtd_copo), 0) FROM compra_confra WHERE edicao = 'confra-2025') p USING (item)
+--    WHERE e.edicao = 'confra-2025';
+-- e, para corrigir, rodar de novo o INSERT abaixo travando o estoque antes, para
+-- nenhum pedido gravado durante a recontagem ficar de fora (os pedidos em
+-- andamento esperam o COMMIT):
+--   BEGIN;
+--   LOCK TABLE estoque IN SHARE ROW EXCLUSIVE MODE;
+--   INSERT INTO estoque ... (abaixo);
+--   COMMIT;
+INSERT INTO estoque (edicao, item, vendido)
+SELECT 'confra-2025', 'confra', COALESCE(SUM(qtd_confra), 0) FROM compra_confra WHERE edicao = 'confra-2025'
+UNION ALL
+SELECT 'confra-2025', 'copo', COALESCE(SUM(qtd_copo), 0) FROM compra_confra WHERE edicao = 'confra-2025'
+ON CONFLICT (edicao, item) DO UPDATE SET vendido = EXCLUDED.vendido;
@@ -0,0 +1,11 @@
+-- Situação do pagamento de cada pedido com ingressos. O pedido entra como
+-- 'pendente' (o comprovante ainda não foi conferido); a organização o marca
+-- como 'confirmado' ou 'cancelado' em admin_ingressos.py. Os QR Codes dos
+-- ingressos só são enviados na confirmação, e a porta recusa qualquer código
+-- de pedido que não esteja confirmado (Confra/ingressos_qr.py).
+-- Os pedidos já existentes ficam pendentes até serem conferidos.
+
+ALTER TABLE compra_confra ADD COLUMN IF NOT EXISTS pagamento TEXT NOT NULL DEFAULT 'pendente'
+    CHECK (pagamento IN ('pendente', 'confirmado', 'cancelado'));
+ALTER TABLE compra_ingressos ADD COLUMN IF NOT EXISTS pagamento TEXT NOT NULL DEFAULT 'pendente'
+    CHECK (pagamento IN ('pendente', 'confirmado', 'cancelado'));
@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Listas grandes (participantes, copos, presença) travam no celular quando o
+# DataFrame inteiro vai para o navegador. Aqui a busca, a ordenação e o corte
+# da página são feitos no servidor e só a página visível é enviada.
+TAMANHO_PAGINA = 50
+
+
+def normalizar_busca(serie):
+    """Dobra caixa e acentos e remove pontuação ("João D'Ávila" -> "joao davila",
+    "123.456.789-00" -> "12345678900"), para comparar texto digitado com a base."""
+    return (
+        serie.fillna('').astype(str)
+        .str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('ascii')
+        .str.lower()
+        .str.replace(r'[^\w\s]', '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def versao_tabela(df):
+    """Versão barata de um DataFrame (tamanho + hash vetorizado), usada como chave do índice."""
+    return f"{len(df)}-{pd.util.hash_pandas_object(df, index=False).sum()}"
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def indice_busca(chave, versao, _df, colunas_busca, colunas_ordenacao):
+    """Índice de uma lista, construído uma vez por versão dos dados:
+    - 'texto': uma string normalizada por linha com todas as colunas de busca;
+    - 'ordens': para cada coluna ordenável e sentido, as posições das linhas já ordenadas
+      (ordenação estável nos dois sentidos, mantendo os ingressos de um pedido em sequência).
+    É só leitura, por isso fica em cache_resource (sem cópia a cada acesso)."""
+    df = _df.reset_index(drop=True)
+    texto = normalizar_busca(df[list(colunas_busca)].astype(str).agg(' '.join, axis=1))
+    ordens = {
+        (coluna, decrescente): df[coluna].sort_values(ascending=not decrescente, kind='stable', na_position='last').index.to_numpy()
+        for coluna in colunas_ordenacao
+        for decrescente in (False, True)
+    }
+    return {'texto': texto.astype('string[pyarrow]'), 'ordens': ordens}
+
+
+def filtrar_ordenar(indice, termo, ordenar_por, decrescente=False):
+    """Posições das linhas que contêm todas as palavras do termo, na ordem pedida."""
+    texto = indice['texto']
+    mascara = np.ones(len(texto), dtype=bool)
+    for palavra in normalizar_busca(pd.Series([termo])).iloc[0].split():
+        mascara &= texto.str.contains(palavra, regex=False).to_numpy(dtype=bool, na_value=False)
+
+    ordem = indice['ordens'][(ordenar_por, decrescente)]
+    return ordem[mascara[ordem]]
+
+
+def _voltar_primeira_pagina(chave):
+    st.session_state[f"{chave}_pagina"] = 1
+
+
+def exibir_tabela_paginada(df, chave, colunas_busca, colunas_ordenacao=None, ordenar_por=None,
+                           decrescente=False, column_config=None, container=None,
+                           tamanho_pagina=TAMANHO_PAGINA, rotulo_busca="🔎 Buscar"):
+    """Tabela com busca, ordenação e paginação feitas no servidor.
+
+    `colunas_busca` são as colunas em que o termo é procurado (sem acento/caixa);
+    `colunas_ordenacao` as oferecidas no seletor (padrão: todas). Só as
+    `tamanho_pagina` linhas da página atual são enviadas ao navegador.
+    `chave` identifica a lista (widgets e cache do índice)."""
+    container = container or st
+    colunas_ordenacao = list(colunas_ordenacao or df.columns)
+    ordenar_por = ordenar_por or colunas_ordenacao[0]
+
+    if df.empty:
+        container.info("Nenhum registro.")
+        return
+
+    indice = indice_busca(chave, versao_tabela(df), df, tuple(colunas_busca), tuple(colunas_ordenacao))
+
+    col_busca, col_ordem, col_sentido = container.columns([3, 2, 1])
+    termo = col_busca.text_input(
+        rotulo_busca, key=f"{chave}_busca", placeholder=", ".join(colunas_busca),
+        on_change=_voltar_primeira_pagina, args=(chave,)
+    )
+    coluna_ordem = col_ordem.selectbox(
+        "Ordenar por", colunas_ordenacao, index=colunas_ordenacao.index(ordenar_por),
+        key=f"{chave}_ordem", on_change=_voltar_primeira_pagina, args=(chave,)
+    )
+    desc = col_sentido.toggle("Decrescente", value=decrescente, key=f"{chave}_desc")
+
+    posicoes = filtrar_ordenar(indice, termo, coluna_ordem, desc)
+    total_paginas = max(math.ceil(len(posicoes) / tamanho_pagina), 1)
+
+    # A página guardada pode não existir mais (ex.: a base encolheu numa ressincronização)
+    chave_pagina = f"{chave}_pagina"
+    if st.session_state.get(chave_pagina, 1) > total_paginas:
+        st.session_state[chave_pagina] = total_paginas
+
+    inicio = (st.session_state.get(chave_pagina, 1) - 1) * tamanho_pagina
+    pagina = df.iloc[posicoes[inicio:inicio + tamanho_pagina]]
+    container.dataframe(pagina, use_container_width=True, hide_index=True, column_config=column_config)
+
+    col_info, col_pagina = container.columns([3, 1])
+    col_pagina.number_input("Página", min_value=1, max_value=total_paginas, step=1, key=chave_pagina)
+    col_info.caption(f"{len(posicoes)} de {len(df)} registros · página {st.session_state[chave_pagina]} de {total_paginas}")
@@ -0,0 +1,98 @@
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+from supabase import create_client
+
+import checkin_offline
+from ingressos_qr import (
+    EVENTOS, PAGAMENTO_CANCELADO, PAGAMENTO_CONFIRMADO, PAGAMENTO_PENDENTE, situacao_pagamentos, verificar_ingresso
+)
+
+# ==== Configuração da Página (DEVE SER O PRIMEIRO COMANDO STREAMLIT) ====
+st.set_page_config(
+    layout="centered",
+    page_title="Validação de Ingressos - Chapiuski",
+    page_icon="🎟️"
+)
+
+load_dotenv()
+
+
+def conectar_supabase():
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+
+def atualizar_pagamentos(cliente, codigo_evento):
+    """Copia a situação dos pagamentos do evento para o espelho offline da porta."""
+    checkin_offline.salvar_pagamentos(EVENTOS[codigo_evento]['nome'], situacao_pagamentos(cliente, codigo_evento))
+
+
+# =========================================================================
+# === VALIDAÇÃO NA PORTA ==================================================
+# =========================================================================
+# O leitor de QR Code funciona como um teclado: "digita" o código no campo e
+# envia com Enter. A assinatura é conferida localmente (ingressos_qr) e a
+# entrada vai para o espelho offline (checkin_offline) — nada depende de internet.
+# A assinatura só prova que o código foi emitido por nós: a entrada também exige
+# que o ingresso esteja na lista do aparelho e que o pedido esteja com o
+# pagamento confirmado na última cópia da situação dos pagamentos.
+# Esta página é aberta na porta e só valida: confirmar, cancelar e reemitir
+# ingressos ficam na página da organização (admin_ingressos.py), com senha.
+
+st.title("🎟️ Validação de Ingressos")
+
+with st.form("form_validacao", clear_on_submit=True):
+    codigo = st.text_input("Código do ingresso", placeholder="Aponte o leitor para o QR Code")
+    validar = st.form_submit_button("Validar", type="primary", use_container_width=True)
+
+if validar and codigo:
+    try:
+        resultado = verificar_ingresso(codigo)
+    except RuntimeError as e:
+        st.error(f"❌ {e}")
+        st.stop()
+
+    if not resultado['valido']:
+        st.error(f"⛔ INGRESSO INVÁLIDO — {resultado['motivo']}")
+    else:
+        evento, chave = resultado['evento'], resultado['chave']
+        ingresso = checkin_offline.buscar_ingresso(evento, chave)
+        pagamento = checkin_offline.situacao_pagamento(evento, resultado['pedido'])
+        nome = ingresso['nome'] if ingresso else "(participante fora do último snapshot)"
+        descricao = f"**{nome}** · {evento} · pedido {resultado['pedido']}, ingresso {resultado['assento'] + 1}"
+        if resultado['crianca']:
+            descricao += " · 🧒 criança"
+
+        if pagamento == PAGAMENTO_CANCELADO:
+            st.error(f"⛔ PEDIDO CANCELADO — {descricao}. Não liberar a entrada.")
+        elif pagamento != PAGAMENTO_CONFIRMADO:
+            motivo = "pagamento pendente" if pagamento == PAGAMENTO_PENDENTE else "pedido fora da lista de pagamentos deste aparelho"
+            st.error(f"⛔ PAGAMENTO NÃO CONFIRMADO ({motivo}) — {descricao}. Confira manualmente com a organização.")
+        elif ingresso is None:
+            st.error(f"⛔ INGRESSO FORA DA LISTA DESTE APARELHO — {descricao}. Confira manualmente com a organização.")
+        elif checkin_offline.registrar_entrada(evento, chave):
+            st.success(f"✅ ENTRADA LIBERADA — {descricao}")
+        else:
+            horario = checkin_offline.entradas(evento).get(chave)
+            st.warning(
+                f"⚠️ INGRESSO JÁ UTILIZADO às {horario:%H:%M} — {descricao}" if horario
+                else f"⚠️ INGRESSO JÁ UTILIZADO — {descricao}"
+            )
+
+st.caption(f"Entradas aguardando envio ao Supabase: {checkin_offline.total_pendentes()}")
+for config in EVENTOS.values():
+    info = checkin_offline.info_pagamentos(config['nome'])
+    st.caption(
+        f"💳 {config['nome']}: situação de {info[1]} pedido(s) salva em {info[0].replace('T', ' ')}." if info
+        else f"💳 {config['nome']}: situação dos pagamentos ainda não baixada neste aparelho."
+    )
+
+if st.button("🔄 Atualizar situação dos pagamentos", help="Precisa de internet. Faça antes de abrir a porta."):
+    try:
+        cliente = conectar_supabase()
+        for codigo_evento in EVENTOS:
+            atualizar_pagamentos(cliente, codigo_evento)
+        st.rerun()
+    except Exception as e:
+        st.error(f"❌ Não foi possível atualizar (a cópia anterior continua valendo): {e}")
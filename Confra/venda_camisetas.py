@@ -1,17 +1,14 @@
 import os
-import smtplib
-import pandas as pd
-import io
 from datetime import datetime
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email import encoders
 
 import streamlit as st
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+import caixa_saida
+import exportacao_pedidos
+from edicoes import EDICAO_CAMISETAS
+
 # ==== Tratamento de Caminhos ====
 PASTA_ATUAL = os.path.dirname(os.path.abspath(__file__))
 def get_p(file): return os.path.join(PASTA_ATUAL, file)
@@ -29,9 +26,11 @@ load_dotenv()
 supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
 
 EMAIL_REMETENTE = os.getenv("EMAIL_REMETENTE")
-EMAIL_SENHA = os.getenv("EMAIL_SENHA")
 EMAIL_DESTINATARIO = os.getenv("EMAIL_DESTINATARIO")
 
+# E-mails saem pela caixa de saída (caixa_saida.py), entregue em segundo plano
+caixa_saida.iniciar_entregador()
+
 # Links PagSeguro
 LINKS_CARTAO = {
     (1, 0, 0): ("R$ 52,63", "https://pag.ae/81xQ1jT7L"),
@@ -64,22 +63,6 @@ LINKS_CARTAO = {
 
 def enviar_emails(dados_atuais, arquivo_comprovante):
     try:
-        # 1. Busca histórico no Supabase para a sua planilha
-        resposta = supabase.table("compra_confra").select("*").gte("id", 54).execute()
-        historico = resposta.data
-        
-        csv_buffer = io.StringIO()
-        if historico:
-            df_historico = pd.DataFrame(historico)
-            colunas_finais = [
-                'id', 'created_at', 'nome_comprador', 'whatsapp_comprador', 'email_comprador',
-                'qtd_bone_avulso', 'qtd_confort', 'qtd_over', 'valor_total',
-                'confort_1_arte', 'confort_1_tam', 'confort_2_arte', 'confort_2_tam',
-                'over_1_arte', 'over_1_tam', 'over_2_arte', 'over_2_tam'
-            ]
-            df_filtrado = df_historico[[c for c in colunas_finais if c in df_historico.columns]]
-            df_filtrado.to_csv(csv_buffer, index=False, sep=';', encoding='utf-8-sig')
-
         # --- PREPARAÇÃO DO CONTEÚDO DE PERSONALIZAÇÃO ---
         detalhes = ""
         for i in range(1, 3):
@@ -91,11 +74,6 @@ def enviar_emails(dados_atuais, arquivo_comprovante):
         # ==========================================
         # E-MAIL 1: PARA O COMPRADOR (SEM PLANILHA)
         # ==========================================
-        msg_comprador = MIMEMultipart()
-        msg_comprador['Subject'] = f"✅ Pedido Confirmado! - {dados_atuais['nome_comprador']}"
-        msg_comprador['From'] = EMAIL_REMETENTE
-        msg_comprador['To'] = dados_atuais['email_comprador']
-
         corpo_comprador = f"""
 Olá {dados_atuais['nome_comprador']}, seu pedido foi recebido!
 
@@ -112,16 +90,10 @@ WhatsApp cadastrado: {dados_atuais['whatsapp_comprador']}
 
 Obrigado por fazer parte do Chapiuski!
         """
-        msg_comprador.attach(MIMEText(corpo_comprador, 'plain'))
 
         # ==========================================
-        # E-MAIL 2: PARA VOCÊ (COM PLANILHA E COMPROVANTE)
+        # E-MAIL 2: PARA VOCÊ (COM COMPROVANTE)
         # ==========================================
-        msg_admin = MIMEMultipart()
-        msg_admin['Subject'] = f"📈 NOVO PEDIDO: {dados_atuais['nome_comprador']}"
-        msg_admin['From'] = EMAIL_REMETENTE
-        msg_admin['To'] = EMAIL_DESTINATARIO
-
         corpo_admin = f"""
         NOVO PEDIDO REGISTRADO - CHAPIUSKI 2026
         ------------------------------------------
@@ -139,41 +111,35 @@ Obrigado por fazer parte do Chapiuski!
         ------------------------------------------
         VALOR TOTAL: R$ {dados_atuais['valor_total']:.2f}
         
-        📎 O comprovante e a planilha seguem em anexo.
+        📎 O comprovante segue em anexo. A planilha completa fica no
+        Painel de Vendas; os pedidos novos chegam no resumo periódico.
         ------------------------------------------
         """
-        msg_admin.attach(MIMEText(corpo_admin, 'plain'))
 
-        # Anexa Planilha (APENAS NO E-MAIL ADMIN)
-        if historico:
-            part_csv = MIMEBase('application', "octet-stream")
-            part_csv.set_payload(csv_buffer.getvalue().encode('utf-8-sig'))
-            encoders.encode_base64(part_csv)
-            part_csv.add_header('Content-Disposition', 'attachment; filename="historico_vendas.csv"')
-            msg_admin.attach(part_csv)
-
-        # Anexa Comprovante (APENAS NO E-MAIL ADMIN)
+        # Comprovante (APENAS NO E-MAIL ADMIN)
+        anexos_admin = []
         if arquivo_comprovante:
-            part_img = MIMEBase('application', "octet-stream")
-            part_img.set_payload(arquivo_comprovante.getvalue())
-            encoders.encode_base64(part_img)
-            part_img.add_header('Content-Disposition', 'attachment; filename="comprovante.png"')
-            msg_admin.attach(part_img)
+            extensao = os.path.splitext(arquivo_comprovante.name)[1] or ".png"
+            anexos_admin.append((f"comprovante{extensao}", arquivo_comprovante.getvalue()))
 
         # --- ENVIO FINAL ---
         destinatarios_admin = [d.strip() for d in EMAIL_DESTINATARIO.split(",")]
-        
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(EMAIL_REMETENTE, EMAIL_SENHA)
-            
-            # Envia para você/admins
-            server.sendmail(EMAIL_REMETENTE, destinatarios_admin, msg_admin.as_string())
-            
-            # Envia para o comprador
-            server.sendmail(EMAIL_REMETENTE, [dados_atuais['email_comprador']], msg_comprador.as_string())
+
+        # Só enfileira; o entregador envia as duas por uma sessão SMTP do pool
+        # Para você/admins
+        caixa_saida.enviar_email(
+            EMAIL_REMETENTE, destinatarios_admin, f"📈 NOVO PEDIDO: {dados_atuais['nome_comprador']}",
+            texto=corpo_admin, anexos=anexos_admin
+        )
+
+        # Para o comprador
+        caixa_saida.enviar_email(
+            EMAIL_REMETENTE, [dados_atuais['email_comprador']], f"✅ Pedido Confirmado! - {dados_atuais['nome_comprador']}",
+            texto=corpo_comprador
+        )
             
     except Exception as e:
-        st.error(f"Erro ao gerar histórico/enviar e-mail: {e}")
+        st.error(f"Erro ao enviar e-mail: {e}")
 
 # ==== Interface ====
 exibir_imagem_segura("Central.jpeg")
@@ -283,11 +249,17 @@ if any(total_tupla):
                         "nome_comprador": n, "email_comprador": e, "whatsapp_comprador": w,
                         "qtd_bone_avulso": q_bone, "qtd_confort": q_comfort, "qtd_over": q_over,
                         "valor_total": float(valor_final), "created_at": datetime.now().isoformat(),
-                        **dados_venda
+                        "edicao": EDICAO_CAMISETAS, **dados_venda
                     }
-                    supabase.table("compra_confra").insert(p).execute()
+                    resposta = supabase.table("compra_confra").insert(p).execute()
+                    # Só este pedido entra na planilha da organização (exportacao_pedidos.py)
+                    if resposta.data:
+                        try:
+                            exportacao_pedidos.registrar_pedido("historico_vendas", resposta.data[0])
+                        except OSError as ex:
+                            st.warning(f"⚠️ Pedido salvo, mas não foi possível atualizar a planilha local: {ex}")
                     enviar_emails(p, comp)
-                    st.success("Pedido registrado e histórico enviado!")
+                    st.success("Pedido registrado!")
                     st.balloons()
                 except Exception as ex: st.error(f"Erro: {ex}")
             else: st.warning("Preencha tudo!")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import argparse
+import hashlib
+import logging
+import sys
+import time
+
+from streamlit import logger as streamlit_logger
+
+# Fora do servidor, os st.cache_* avisam (ao definir e a cada chamada) que não há sessão
+streamlit_logger.set_log_level("error")
+
+from processamento_painel import (
+    PROCESSADORES, analises_dos_dados, colunas_necessarias, conectar_supabase,
+    sincronizar_tabela, versao_dados
+)
+from figuras_painel import MONTADORES
+from snapshot_painel import marcar_verificacao, salvar_snapshot, versao_publicada
+
+# Worker do snapshot do painel de vendas. Roda fora do Streamlit e, a cada
+# ciclo, busca só os pedidos novos (delta sync); quando os dados brutos mudaram,
+# refaz processamento, análises e figuras uma única vez e publica um snapshot
+# (snapshot_painel.py) que todas as sessões do painel apenas leem.
+#   python Confra/worker_painel.py             verifica a cada INTERVALO_PADRAO segundos
+#   python Confra/worker_painel.py --uma-vez   gera (se preciso) e sai, para rodar via cron
+INTERVALO_PADRAO = 30
+
+log = logging.getLogger("worker_painel")
+
+
+def buscar_brutos():
+    """Tabelas brutas do painel (só as colunas usadas), via delta sync."""
+    return {tabela: sincronizar_tabela(tabela, colunas_necessarias(tabela)) for tabela in PROCESSADORES}
+
+
+def impressao_dos_brutos(brutos):
+    """Impressão digital do conjunto de tabelas brutas: muda quando chega, muda ou sai um pedido."""
+    versoes = '|'.join(f"{tabela}:{versao_dados(df)}" for tabela, df in sorted(brutos.items()))
+    return hashlib.sha1(versoes.encode()).hexdigest()
+
+
+def gerar_snapshot(brutos, origem):
+    """Processa as tabelas, calcula as análises, monta as figuras e publica."""
+    dados = {tabela: PROCESSADORES[tabela](df) for tabela, df in brutos.items()}
+    analises = analises_dos_dados(dados)
+    figuras = {
+        secao: montar(analises if secao == 'analises' else dados)
+        for secao, montar in MONTADORES.items()
+    }
+    return salvar_snapshot(origem, dados, analises, figuras)
+
+
+def ciclo(forcar=False):
+    """Um ciclo do worker. Retorna a versão publicada, ou None se nada mudou."""
+    brutos = buscar_brutos()
+    origem = impressao_dos_brutos(brutos)
+
+    publicada = versao_publicada()
+    if not forcar and publicada is not None and publicada['origem'] == origem:
+        marcar_verificacao()
+        return None
+    return gerar_snapshot(brutos, origem)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o snapshot pré-calculado do painel de vendas.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_PADRAO, help="segundos entre verificações")
+    parser.add_argument("--uma-vez", action="store_true", help="executa um ciclo e sai")
+    parser.add_argument("--forcar", action="store_true", help="gera um snapshot mesmo sem pedidos novos")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if conectar_supabase() is None:
+        log.error("Variáveis de ambiente SUPABASE_URL ou SUPABASE_KEY não configuradas.")
+        sys.exit(1)
+
+    forcar = args.forcar
+    while True:
+        inicio = time.perf_counter()
+        try:
+            versao = ciclo(forcar)
+            forcar = False
+            if versao:
+                log.info("Snapshot %s publicado em %.1fs.", versao, time.perf_counter() - inicio)
+        except Exception:
+            log.exception("Falha ao atualizar o snapshot; a versão anterior continua publicada.")
+
+        if args.uma_vez:
+            break
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    main()